@@ -0,0 +1,109 @@
+"""
+Resident batch worker: one warm process runs every batch.
+
+watch_and_trigger.py in batch mode starts a fresh interpreter per flag, so
+each batch pays for importing pyflink/pandas/sklearn, unpickling both
+preprocessors, starting the Flink environment and opening new Kafka and ML
+connections. This daemon pays that once, then waits for the flag (inotify,
+see utils/flag_watcher.py), runs the batch on the warm table environment,
+producer and ML client, and removes the flag.
+
+Startup time is reported once; each batch reports its own read, transform
+and score timings.
+
+    FLINK_MODE=daemon python batch_daemon.py
+"""
+import time
+
+_process_start = time.perf_counter()
+
+import asyncio
+import json
+import signal
+
+# The preprocessors are unpickled from __main__; the classes must be defined
+# there before stage_predictor (imported by flink_job) loads them
+from transformers.custom_transformers import (
+    DelayMinSmoother,
+    FeatureEngineeringTransformer,
+    OrdinalEncoderTransformer,
+)
+
+from flink_job import (
+    create_table_env, open_prediction_state, open_weather_state, open_fingerprint_store,
+    run_batch, print_summary,
+)
+from utils.kafka_utils import get_producer, DeliveryTracker
+from utils.flag_watcher import FlagWatcher
+from utils.logger import get_logger
+from utils.ml_client import ml_client
+
+from settings import FLAG_PATH, FLAG_POLL_SECONDS
+
+
+async def run_daemon():
+    logger = get_logger("FLINK_DAEMON")
+
+    t_env = create_table_env()
+    producer = get_producer()
+    state = open_prediction_state()
+    weather_state = open_weather_state()
+    fingerprints = open_fingerprint_store()
+    watcher = FlagWatcher(FLAG_PATH, poll_seconds=FLAG_POLL_SECONDS)
+
+    logger.info(
+        f"Startup took {time.perf_counter() - _process_start:.2f}s "
+        f"(imports, preprocessors, Flink env, Kafka producer{', prediction state' if state else ''})"
+    )
+    logger.info(f"Waiting for batch flag at {FLAG_PATH} ({watcher.mode})")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    loop = asyncio.get_running_loop()
+    batches = 0
+    try:
+        while not stopping:
+            # Blocking wait off the event loop, in short slices so SIGTERM is noticed
+            if not await loop.run_in_executor(None, watcher.wait, 1.0):
+                continue
+
+            batches += 1
+            logger.info(f"Flag detected. Running batch {batches}...")
+            batch_start = time.perf_counter()
+            delivery = DeliveryTracker()
+            try:
+                counts = await run_batch(
+                    t_env, producer, delivery, state, logger,
+                    weather_state=weather_state, fingerprints=fingerprints,
+                )
+            except Exception as e:
+                counts = None
+                logger.error(f"Batch {batches} failed: {type(e).__name__}: {e}")
+
+            if counts is not None:
+                print_summary(counts, delivery)
+                logger.info(
+                    f"Batch {batches} took {time.perf_counter() - batch_start:.2f}s: "
+                    f"{json.dumps(counts['timings'])}"
+                )
+
+            FLAG_PATH.unlink(missing_ok=True)  # clean up
+            print("Batch finished and flag removed.")
+    finally:
+        watcher.close()
+        await ml_client.close()
+        producer.close()
+        if fingerprints is not None:
+            fingerprints.close()
+        logger.info(f"Stopped after {batches} batches")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_daemon())
@@ -1,60 +1,268 @@
 import json
 import asyncio
+import numpy as np
 import pandas as pd
-import httpx
 import os
+import time
 
 from pyflink.common import Configuration, RestartStrategies
 from pyflink.datastream import StreamExecutionEnvironment
 from pyflink.table import StreamTableEnvironment, EnvironmentSettings
 
-from utils.kafka_utils import flink_read, get_producer
-from utils.flink_utils import flatten_json_column
+from utils.kafka_utils import flink_read, get_producer, DeliveryTracker, ensure_compacted_topic
+from utils.prediction_state import PredictionStateStore
+from utils.weather_state import WeatherFeatureState
+from utils.fingerprint_store import FingerprintStore, fingerprint_rows
+from utils.flink_utils import flatten_json_column, prioritize_by_departure
+from utils.payload_decoder import decode_payloads, decode_table, FLIGHT_SCHEMA, WEATHER_SCHEMA
+from utils.memory_monitor import MemoryMonitor
 from utils.logger import get_logger
+from utils.ml_client import ml_client
+from utils.executor import AIMDLimiter, BoundedExecutor, DeadlineExceeded
 
 from transformers.flight_topic_processor import transform_flights_data_serving
 from transformers.weather_topic_processor import transform_weather_data_serving
-from transformers.merge_processor import merge_weather_forecast_serving
+from transformers.merge_processor import merge_weather_forecast_serving, WEATHER_MATCH_TOLERANCE
 from transformers.custom_transformers import (
     DelayMinSmoother,
     FeatureEngineeringTransformer,
     OrdinalEncoderTransformer,
 )
 
-from predictors.stage_predictor import process_record
+from predictors.stage_predictor import process_record, prepare_batch, process_matrix_remote
+
+from settings import (
+    WEATHER_TOPIC, FLIGHT_TOPIC, PREDICTION_TOPIC, feature_order, FLAG_PATH,
+    PREDICTION_MODE, ML_CHUNK_SIZE, ML_CONCURRENCY,
+    ML_MIN_CONCURRENCY, ML_MAX_CONCURRENCY, ML_LATENCY_TOLERANCE, ML_BATCH_DEADLINE_SECONDS,
+    PRIORITIZE_BY_DEPARTURE, SKIP_DEPARTED_FLIGHTS,
+    PREDICTION_STATE_TOPIC, PREDICTION_CHANGES_ONLY,
+    WEATHER_STATE_PATH, WEATHER_STATE_HOURS,
+    FINGERPRINT_STORE_PATH, FINGERPRINT_TTL_HOURS,
+    PIPELINE_MEMORY_BUDGET_MB,
+)
 
-from settings import WEATHER_TOPIC, FLIGHT_TOPIC, PREDICTION_TOPIC, feature_order, FLAG_PATH
+# How much memory one flight takes through transform, merge, preprocessing
+# and scoring, as a multiple of its decoded size. Partitioned runs raise the
+# estimate when a partition's RSS growth shows flights cost more (freed memory
+# stays resident, so RSS can only ever show they cost more, never less)
+FLIGHT_MEMORY_EXPANSION = 50
+MIN_PARTITION_ROWS = 100
 
-semaphore = asyncio.Semaphore(10)  # limit concurrency to 10
+def record_work_items(merged_df):
+    """(unique_keys, work) pairs of one flight each, preprocessed per request"""
+    for _, row in merged_df.iterrows():
+        yield [row["unique_key"]], row.to_dict()
 
-batch_size = 100
 
-async def safe_process_record(payload, expected_cols_stage1, expected_cols_stage2, retries=2):
-    """Call process_record safely with concurrency limit and retry on failure."""
-    for attempt in range(retries + 1):
-        try:
-            async with semaphore:
-                return await process_record(
-                    payload,
-                    expected_cols_stage1=expected_cols_stage1,
-                    expected_cols_stage2=expected_cols_stage2,
-                )
-        except httpx.RequestError as e:  # timeout or network errors
-            if attempt == retries:
-                raise
-            await asyncio.sleep(1.5)  # brief delay before retry
+def chunk_work_items(keys, X1, X2):
+    """(unique_keys, work) pairs of ML_CHUNK_SIZE flights from the batch-preprocessed matrices"""
+    for i in range(0, len(keys), ML_CHUNK_SIZE):
+        yield keys[i : i + ML_CHUNK_SIZE], (X1[i : i + ML_CHUNK_SIZE], X2[i : i + ML_CHUNK_SIZE])
 
 
+async def predict_work_item(item):
+    """One ML call for a work item; returns one result per unique key"""
+    keys, work = item
+    if isinstance(work, dict):
+        return [
+            await process_record(
+                work,
+                expected_cols_stage1=feature_order,
+                expected_cols_stage2=feature_order,
+            )
+        ]
+    return await process_matrix_remote(*work)
 
-# ==================================================
-#   FLINK MAIN PIPELINE
-# ==================================================
 
+def has_errors(results):
+    return any("error" in result for result in results)
 
-async def run_pipeline():
-    logger = get_logger("FLINK")
+
+def decode_topic_frame(pdf, schema, name, logger):
+    """Raw `data` messages decoded into typed schema columns; other shapes go through flatten_json_column"""
+    if "data" not in pdf.columns:
+        return flatten_json_column(pdf)
+
+    decoded, stats = decode_payloads(pdf["data"], schema)
+    logger.info(f"Decoded {name} topic: {json.dumps(stats)}")
+    return decoded
+
+
+def build_merged_frame(weather_pdf, flight_pdf, logger, weather_state=None):
+    """Decode, transform and merge raw weather/flight rows into scoring order"""
+    weather_pdf = decode_topic_frame(weather_pdf, WEATHER_SCHEMA, "weather", logger)
+    flight_pdf = decode_topic_frame(flight_pdf, FLIGHT_SCHEMA, "flight", logger)
+
+    # -----------------------------
+    #  APPLY TRANSFORMERS
+    # -----------------------------
+    logger.info("Transforming WEATHER data...")
+    weather_df = transform_weather_data_serving(weather_pdf, logger, state=weather_state)
+
+    return merge_flights(flight_pdf, weather_df, logger)
+
+
+def merge_flights(flight_pdf, weather_df, logger):
+    """Transform decoded flights and merge them with transformed weather, in scoring order"""
+    logger.info("Transforming FLIGHT data...")
+    flights_df = transform_flights_data_serving(flight_pdf, logger)
+
+    # Merge
+    merged_df = merge_weather_forecast_serving(flights_df, weather_df, logger)
+
+    # Imminent departures first: the executor dispatches (and so publishes)
+    # roughly in this order
+    if PRIORITIZE_BY_DEPARTURE:
+        merged_df = prioritize_by_departure(merged_df, skip_departed=SKIP_DEPARTED_FLIGHTS)
+
+    return merged_df
+
+
+def weather_for_flights(flight_pdf, weather_df):
+    """Weather rows that merge_weather_forecast_serving can match to these decoded flights"""
+    airports = set(flight_pdf["originAirportIata"].dropna()) | set(flight_pdf["destinationAirportIata"].dropna())
+    rows = weather_df["airport_iata"].isin(airports)
+
+    times = pd.concat([
+        pd.to_datetime(flight_pdf["scheduledDepartureTime"], errors="coerce"),
+        pd.to_datetime(flight_pdf["scheduledArrivalTime"], errors="coerce"),
+    ]).dropna()
+    if not times.empty:
+        rows &= weather_df["datetime"].between(
+            times.min() - WEATHER_MATCH_TOLERANCE, times.max() + WEATHER_MATCH_TOLERANCE,
+        )
+    return weather_df[rows]
 
 
+async def score_and_publish(merged_df, producer, delivery, state, logger, deadline=None, fingerprints=None):
+    """
+    Score every merged flight through the executor and publish each result as it completes
+
+    With a FingerprintStore (batch mode only), flights whose final feature
+    vectors are unchanged since they were last scored get their stored
+    prediction instead of an ML call.
+
+    Returns:
+        success / errors / shed / reused / total counts
+    """
+    success_count = 0
+    error_count = 0
+    shed_count = 0
+    reused_count = 0
+    if fingerprints is not None and PREDICTION_MODE != "record":
+        # One row per flight (latest message wins), so each unique_key maps
+        # to exactly one fingerprint and one stored prediction
+        merged_df = merged_df.drop_duplicates("unique_key", keep="last")
+    total = len(merged_df)
+
+    def publish(item, results):
+        """Executor sink: write each finished work item to Kafka as it completes"""
+        nonlocal success_count, error_count, shed_count
+        keys, _ = item
+        if isinstance(results, DeadlineExceeded):
+            shed_count += len(keys)
+        if isinstance(results, Exception):
+            results = [{"error": str(results), "error_type": type(results).__name__} for _ in keys]
+
+        for unique_key, result in zip(keys, results):
+            message = {
+                "unique_key": unique_key,
+                "stage": result.get("stage"),
+                "prediction": result.get("prediction"),
+                "timestamp": pd.Timestamp.now().isoformat()
+            }
+            try:
+                # Errors never overwrite the last good prediction in the state topic
+                changed = True
+                if state is not None and "error" not in result:
+                    changed = state.publish(delivery, producer, unique_key, message)
+
+                if changed or not PREDICTION_CHANGES_ONLY:
+                    delivery.send(producer, PREDICTION_TOPIC, unique_key, message)
+
+                # Track success/errors
+                if "error" not in result:
+                    success_count += 1
+                else:
+                    error_count += 1
+                    print(f"[ERROR] {unique_key}: {result.get('error')}")
+
+            except Exception as e:
+                error_count += 1
+                print(f"[KAFKA ERROR] Failed to send {unique_key}: {e}")
+
+        done = success_count + error_count
+        if len(keys) > 1 or done % 100 == 0 or done == total:
+            logger.info(f"Processed {done}/{total} records...")
+
+    sink = publish
+    if PREDICTION_MODE == "record":
+        items = record_work_items(merged_df)
+    else:
+        keys = merged_df["unique_key"].tolist()
+        try:
+            X1, X2 = prepare_batch(merged_df, feature_order, feature_order)
+        except Exception as e:
+            logger.error(f"Batch preprocessing failed: {type(e).__name__}: {e}")
+            publish((keys, None), e)
+            keys, X1, X2 = [], None, None
+
+        if fingerprints is not None and keys:
+            row_fingerprints = fingerprint_rows(X1, X2)
+            fingerprint_of = dict(zip(keys, row_fingerprints))
+            cached = fingerprints.lookup(keys, row_fingerprints)
+            if cached:
+                # Same features as last time: reuse the stored prediction
+                reused_count = len(cached)
+                publish((list(cached), None), list(cached.values()))
+                to_score = np.array([key not in cached for key in keys])
+                keys, X1, X2 = [key for key in keys if key not in cached], X1[to_score], X2[to_score]
+            logger.info(f"Fingerprints: {reused_count} flights unchanged, {len(keys)} to score")
+
+            def sink(item, results):
+                publish(item, results)
+                if isinstance(results, Exception):
+                    return
+                try:
+                    fingerprints.put_many(
+                        (unique_key, fingerprint_of[unique_key], result)
+                        for unique_key, result in zip(item[0], results)
+                        if "error" not in result
+                    )
+                except Exception as e:
+                    # Already published; those flights are just re-scored next batch
+                    logger.warning(f"Could not store fingerprints: {type(e).__name__}: {e}")
+
+        items = chunk_work_items(keys, X1, X2) if keys else []
+
+    limiter = AIMDLimiter(
+        initial=ML_CONCURRENCY,
+        min_limit=ML_MIN_CONCURRENCY,
+        max_limit=ML_MAX_CONCURRENCY,
+        latency_tolerance=ML_LATENCY_TOLERANCE,
+    )
+    executor = BoundedExecutor(concurrency=ML_CONCURRENCY, limiter=limiter)
+    executor_stats = await executor.run(
+        items, predict_work_item, sink, deadline=deadline, is_failure=has_errors,
+    )
+
+    logger.info(f"Saved {success_count} prediction results to Kafka {PREDICTION_TOPIC}...")
+    logger.info(f"Executor stats: {json.dumps(executor_stats)}")
+
+    return {
+        "success": success_count,
+        "errors": error_count,
+        "shed": shed_count,
+        "reused": reused_count,
+        "total": total,
+    }
+
+
+# ==================================================
+#   FLINK MAIN PIPELINE
+# ==================================================
+def create_table_env():
     # Increase buffer from 2MB to 20MB
     config = Configuration()
     config.set_string("collect-sink.batch-size.max", "20971520")
@@ -68,12 +276,39 @@ async def run_pipeline():
     # -----------------------------
     env = StreamExecutionEnvironment.get_execution_environment(config)
     settings = EnvironmentSettings.new_instance().in_streaming_mode().build()
-    t_env = StreamTableEnvironment.create(env, environment_settings=settings)
+    return StreamTableEnvironment.create(env, environment_settings=settings)
 
-    logger.info("Starting Flink Job...")
 
-    # Time start
-    start_time = pd.Timestamp.now()
+def open_prediction_state():
+    if not PREDICTION_STATE_TOPIC:
+        return None
+    ensure_compacted_topic(PREDICTION_STATE_TOPIC)
+    state = PredictionStateStore(PREDICTION_STATE_TOPIC)
+    state.load()
+    return state
+
+
+def open_weather_state():
+    if not WEATHER_STATE_PATH:
+        return None
+    weather_state = WeatherFeatureState(WEATHER_STATE_PATH, retain_hours=WEATHER_STATE_HOURS)
+    weather_state.load()
+    return weather_state
+
+
+def open_fingerprint_store():
+    if not FINGERPRINT_STORE_PATH:
+        return None
+    fingerprints = FingerprintStore(FINGERPRINT_STORE_PATH, ttl_hours=FINGERPRINT_TTL_HOURS)
+    pruned = fingerprints.prune()
+    get_logger("FLINK").info(f"Fingerprint store: {json.dumps(fingerprints.stats())} ({pruned} pruned)")
+    return fingerprints
+
+
+async def read_and_score(t_env, producer, delivery, state, logger, deadline=None, weather_state=None, fingerprints=None):
+    """Whole-window path: both topics in memory at once, one merged frame, one executor run"""
+    timings = {}
+    phase_start = time.perf_counter()
 
     # -----------------------------
     #  READ BOTH TOPICS
@@ -87,27 +322,21 @@ async def run_pipeline():
 
     logger.info(f"Weather topic rows: {len(weather_pdf)}")
     logger.info(f"Flight topic rows: {len(flight_pdf)}")
-
+    timings["read_s"] = time.perf_counter() - phase_start
 
     if weather_pdf.empty or flight_pdf.empty:
         logger.warning("One or both topics returned no data. Skipping processing.")
-        return
-
-    # Flatten JSON columns if needed
-    weather_pdf = flatten_json_column(weather_pdf)
-    flight_pdf = flatten_json_column(flight_pdf)
+        return None
 
-    # -----------------------------
-    #  APPLY TRANSFORMERS
-    # -----------------------------
-    logger.info("Transforming WEATHER data...")
-    weather_df = transform_weather_data_serving(weather_pdf, logger)
-
-    logger.info("Transforming FLIGHT data...")
-    flights_df = transform_flights_data_serving(flight_pdf, logger)
-
-    # Merge
-    merged_df = merge_weather_forecast_serving(flights_df, weather_df, logger)
+    phase_start = time.perf_counter()
+    merged_df = build_merged_frame(weather_pdf, flight_pdf, logger, weather_state=weather_state)
+    if weather_state is not None:
+        weather_state.save()
+        logger.info(f"Weather feature state stats: {json.dumps(weather_state.stats())}")
+    timings["transform_s"] = time.perf_counter() - phase_start
+    if merged_df.empty:
+        logger.warning("No upcoming flights left to score. Skipping predictions.")
+        return None
 
 
     # # ---------------------------
@@ -123,76 +352,196 @@ async def run_pipeline():
 
     logger.info("Running ML predictions and writing to Kafka...")
 
-    producer = get_producer()
+    phase_start = time.perf_counter()
+    counts = await score_and_publish(
+        merged_df, producer, delivery, state, logger, deadline=deadline, fingerprints=fingerprints,
+    )
+    timings["score_s"] = time.perf_counter() - phase_start
 
-    coros = []
-    rows = []
-    for _, row in merged_df.iterrows():
-        payload = row.to_dict()
+    counts["timings"] = timings
+    return counts
 
-        unique_key = row["unique_key"]
 
-        rows.append({"unique_key": unique_key})
+async def read_and_score_partitioned(
+    t_env, producer, delivery, state, logger, memory, deadline=None, weather_state=None, fingerprints=None,
+):
+    """
+    Memory-bounded path: flights are scored in departure-time partitions
 
-        coros.append(
-            safe_process_record(
-                payload,
-                expected_cols_stage1=feature_order,
-                expected_cols_stage2=feature_order,
+    Both topics are decoded block by block as Flink returns them (no raw
+    to_pandas() frame). Weather is transformed once; each partition of
+    flights is then transformed, merged with only the weather rows it can
+    match, scored and produced before the next one starts. Partition size
+    starts from an estimate and follows the RSS each partition really used,
+    to stay within PIPELINE_MEMORY_BUDGET_MB.
+    """
+    timings = {}
+    phase_start = time.perf_counter()
+
+    weather_pdf, weather_stats = decode_table(flink_read(t_env, WEATHER_TOPIC), WEATHER_SCHEMA)
+    flight_pdf, flight_stats = decode_table(flink_read(t_env, FLIGHT_TOPIC), FLIGHT_SCHEMA)
+
+    logger.info(f"Decoded weather topic: {json.dumps(weather_stats)}")
+    logger.info(f"Decoded flight topic: {json.dumps(flight_stats)}")
+    timings["read_s"] = time.perf_counter() - phase_start
+
+    if weather_pdf.empty or flight_pdf.empty:
+        logger.warning("One or both topics returned no data. Skipping processing.")
+        return None
+
+    phase_start = time.perf_counter()
+    logger.info("Transforming WEATHER data...")
+    weather_df = transform_weather_data_serving(weather_pdf, logger, state=weather_state)
+    del weather_pdf
+    if weather_state is not None:
+        weather_state.save()
+        logger.info(f"Weather feature state stats: {json.dumps(weather_state.stats())}")
+
+    # Partitions in departure order: upcoming soonest first, then departed
+    flight_pdf = prioritize_by_departure(
+        flight_pdf.rename(columns={"scheduledDepartureTime": "sched_dep_time"}),
+        skip_departed=SKIP_DEPARTED_FLIGHTS,
+    ).rename(columns={"sched_dep_time": "scheduledDepartureTime"})
+    timings["transform_s"] = time.perf_counter() - phase_start
+
+    budget_bytes = PIPELINE_MEMORY_BUDGET_MB * 1024 * 1024
+    decoded_row_bytes = flight_pdf.memory_usage(deep=True).sum() / max(1, len(flight_pdf))
+    flight_bytes = max(1.0, decoded_row_bytes * FLIGHT_MEMORY_EXPANSION)
+    rows = max(MIN_PARTITION_ROWS, int(budget_bytes // flight_bytes))
+
+    logger.info("Running ML predictions and writing to Kafka in partitions...")
+    phase_start = time.perf_counter()
+    totals = {"success": 0, "errors": 0, "shed": 0, "reused": 0, "total": 0}
+    partitions = 0
+    start = 0
+    while start < len(flight_pdf):
+        partition = flight_pdf.iloc[start : start + rows]
+        start += len(partition)
+        partitions += 1
+
+        baseline = memory.mark()
+        merged_df = merge_flights(partition, weather_for_flights(partition, weather_df), logger)
+        if not merged_df.empty:
+            counts = await score_and_publish(
+                merged_df, producer, delivery, state, logger, deadline=deadline, fingerprints=fingerprints,
             )
+            for name in totals:
+                totals[name] += counts[name]
+        del merged_df
+
+        # Shrink later partitions if this one grew RSS by more than estimated
+        used = max(0, memory.mark_peak() - baseline)
+        flight_bytes = max(flight_bytes, used / len(partition))
+        rows = max(MIN_PARTITION_ROWS, int(budget_bytes // flight_bytes))
+        logger.info(
+            f"Partition {partitions}: {len(partition)} flights, "
+            f"+{used / 1024 / 1024:.1f} MB RSS, done {start}/{len(flight_pdf)}"
         )
 
-    success_count = 0
-    error_count = 0
-    i = 0
-    total_coros = len(coros)
+    timings["score_s"] = time.perf_counter() - phase_start
+    totals["partitions"] = partitions
+    totals["timings"] = timings
+    return totals
+
+
+async def run_batch(t_env, producer, delivery, state, logger, weather_state=None, fingerprints=None):
+    """
+    Read the current batch window from both topics, then score and publish it
+
+    Runs partitioned when PIPELINE_MEMORY_BUDGET_MB is set, whole otherwise.
+
+    Returns:
+        Counts from score_and_publish plus per-phase seconds and the batch's
+        memory use, or None when there was nothing to score
+    """
+    deadline = time.monotonic() + ML_BATCH_DEADLINE_SECONDS if ML_BATCH_DEADLINE_SECONDS > 0 else None
+    memory = MemoryMonitor().start()
+    try:
+        if PIPELINE_MEMORY_BUDGET_MB > 0:
+            counts = await read_and_score_partitioned(
+                t_env, producer, delivery, state, logger, memory,
+                deadline=deadline, weather_state=weather_state, fingerprints=fingerprints,
+            )
+        else:
+            counts = await read_and_score(
+                t_env, producer, delivery, state, logger,
+                deadline=deadline, weather_state=weather_state, fingerprints=fingerprints,
+            )
+    finally:
+        memory.stop()
+        logger.info(f"Batch memory: {json.dumps(memory.stats())}")
 
-    while i <= total_coros:
-        batch = coros[i : i + batch_size]
-        results = await asyncio.gather(*batch)
+    if counts is None:
+        return None
 
-        for j, result in enumerate(results):
-            meta = rows[i + j]
-            message = {
-                "unique_key": meta["unique_key"],
-                "stage": result.get("stage"),
-                "prediction": result.get("prediction"),
-                "timestamp": pd.Timestamp.now().isoformat()
-            }
-            try:
-                logger.info(f"Writing prediction results to Kafka {PREDICTION_TOPIC}...")
-                producer.send(PREDICTION_TOPIC, value=message)
+    if state is not None:
+        state.tombstone_departed(delivery, producer)
+        logger.info(f"Prediction state stats: {json.dumps(state.stats())}")
 
-                # Track success/errors
-                if "error" not in result:
-                    success_count += 1
-                else:
-                    error_count += 1
-                    print(f"[ERROR] {meta['unique_key']}: {result.get('error')}")
+    # Wait for outstanding batches so every delivery callback has fired
+    phase_start = time.perf_counter()
+    producer.flush()
+    counts["timings"]["flush_s"] = time.perf_counter() - phase_start
 
-            except Exception as e:
-                error_count += 1
-                print(f"[KAFKA ERROR] Failed to send {meta['unique_key']}: {e}")
+    logger.info("Finished sending predictions.")
+    logger.info(f"ML client stats: {json.dumps(ml_client.stats())}")
+    logger.info(f"Kafka delivery stats: {json.dumps(delivery.stats())}")
+    if fingerprints is not None:
+        fingerprints.prune()
+        logger.info(f"Fingerprint store stats: {json.dumps(fingerprints.stats())}")
 
-        logger.info(f"Saved {success_count} prediction results to Kafka {PREDICTION_TOPIC}...")
+    counts["timings"] = {phase: round(seconds, 3) for phase, seconds in counts["timings"].items()}
+    counts["memory"] = memory.stats()
+    return counts
 
-        i += batch_size
-        logger.info(f"Processed {min(i, total_coros)}/{total_coros} records...")
 
-    logger.info("Finished sending predictions.")
+def print_summary(counts, delivery):
+    print(f"\n[BATCH] Complete:")
+    print(f"  ✓ Success: {counts['success']}")
+    print(f"  ✗ Errors: {counts['errors']}")
+    print(f"  ⏱ Shed at deadline: {counts['shed']}")
+    print(f"  ↺ Unchanged, prediction reused: {counts['reused']}")
+    print(f"  ✉ Delivered to Kafka: {delivery.delivered} (failed: {delivery.failed})")
+    print(f"  Total: {counts['total']}")
+    print(f"  Peak memory: {counts['memory']['peak_rss_mb']} MB")
+
+
+async def run_pipeline():
+    logger = get_logger("FLINK")
+
+    t_env = create_table_env()
+
+    logger.info("Starting Flink Job...")
+
+    # Time start
+    start_time = pd.Timestamp.now()
+
+    producer = get_producer()
+    delivery = DeliveryTracker()
+    state = open_prediction_state()
+    weather_state = open_weather_state()
+    fingerprints = open_fingerprint_store()
+
+    try:
+        counts = await run_batch(
+            t_env, producer, delivery, state, logger,
+            weather_state=weather_state, fingerprints=fingerprints,
+        )
+    finally:
+        await ml_client.close()
+        producer.close()
+        if fingerprints is not None:
+            fingerprints.close()
+
+    if counts is None:
+        return
 
     # Time end
     end_time = pd.Timestamp.now()
     duration = end_time - start_time
     print(f"\nTotal Duration: {duration}")
 
-    producer.flush()
-    producer.close()
-
-    print(f"\n[BATCH] Complete:")
-    print(f"  ✓ Success: {success_count}")
-    print(f"  ✗ Errors: {error_count}")
-    print(f"  Total: {len(results)}")
+    print_summary(counts, delivery)
 
     logger.info("Flink Job completed successfully.")
 
@@ -2,6 +2,8 @@ from dotenv import load_dotenv
 import os
 from pathlib import Path
 
+from utils.feature_schema import FEATURE_ORDER
+
 load_dotenv()
 
 
@@ -16,58 +18,103 @@ GROUP_ID = "flink-group"
 raw_path = os.getenv("FLAG_PATH")
 FLAG_PATH = Path(raw_path)
 
-feature_order = [
-    "airline_name",
-    "origin_visibility_km",
-    "origin_precip_mm",
-    "origin_precip_prob_pct",
-    "origin_wind_speed_kmph",
-    "origin_wind_dir_deg",
-    "origin_temp_c",
-    "origin_humidity_pct",
-    "origin_pressure_mb",
-    "origin_cloud_cover_pct",
-    "origin_wind_speed_prev1h",
-    "origin_wind_speed_3h_mean",
-    "origin_precip_3h_sum",
-    "origin_visibility_3h_mean",
-    "origin_low_visibility_flag",
-    "origin_high_wind_flag",
-    "origin_high_humidity_flag",
-    "origin_rain_intensity",
-    "origin_wind_u",
-    "origin_wind_v",
-    "dest_visibility_km",
-    "dest_precip_mm",
-    "dest_precip_prob_pct",
-    "dest_wind_speed_kmph",
-    "dest_wind_dir_deg",
-    "dest_temp_c",
-    "dest_humidity_pct",
-    "dest_pressure_mb",
-    "dest_cloud_cover_pct",
-    "dest_wind_speed_prev1h",
-    "dest_wind_speed_3h_mean",
-    "dest_precip_3h_sum",
-    "dest_visibility_3h_mean",
-    "dest_low_visibility_flag",
-    "dest_high_wind_flag",
-    "dest_high_humidity_flag",
-    "dest_rain_intensity",
-    "dest_wind_u",
-    "dest_wind_v",
-    "route_adj_delay_mean",
-    "airline_adj_delay_mean",
-    "route_airline_adj_delay_mean",
-    "sched_dep_month_enc",
-    "sched_dep_dow_enc",
-    "sched_dep_time_block_enc",
-    "temp_diff",
-    "visibility_diff",
-    "wind_speed_diff",
-    "precip_prob_diff",
-    "origin_weather_index",
-    "dest_weather_index",
-    "route_freq",
-    "is_busy_route",
-]
+feature_order = FEATURE_ORDER
+
+# "batch" runs each preprocessor once over the whole merged batch and scores
+# it in ML_CHUNK_SIZE-row chunks on the binary cascade endpoint; "record"
+# keeps the one-request-per-flight path. ML_CHUNK_SIZE must not exceed the
+# ML service's ML_MAX_BATCH_SIZE.
+PREDICTION_MODE = os.getenv("PREDICTION_MODE", "batch")
+ML_CHUNK_SIZE = int(os.getenv("ML_CHUNK_SIZE", 1000))
+
+# ML requests (records or chunks) kept in flight by the sliding-window executor.
+# The limit adapts (AIMD) between ML_MIN_CONCURRENCY and ML_MAX_CONCURRENCY,
+# starting at ML_CONCURRENCY: it grows while calls succeed near the best
+# latency seen and shrinks on failures or once the smoothed latency exceeds
+# ML_LATENCY_TOLERANCE x that best latency.
+ML_CONCURRENCY = int(os.getenv("ML_CONCURRENCY", 10))
+ML_MIN_CONCURRENCY = int(os.getenv("ML_MIN_CONCURRENCY", 1))
+ML_MAX_CONCURRENCY = int(os.getenv("ML_MAX_CONCURRENCY", 64))
+ML_LATENCY_TOLERANCE = float(os.getenv("ML_LATENCY_TOLERANCE", 2.0))
+
+# Seconds after the job starts by which every ML call must be done, so a
+# slow batch cannot run into the next one. Calls not started in time, or
+# still running at the deadline, are shed and counted. 0 disables it.
+ML_BATCH_DEADLINE_SECONDS = float(os.getenv("ML_BATCH_DEADLINE_SECONDS", 3300))
+
+# Shared ML API client (utils/ml_client.py): one keep-alive connection pool
+# per job, transient failures (connection errors, timeouts, 429/502/503/504)
+# retried with exponential backoff and full jitter, and a circuit breaker that
+# fails fast for ML_BREAKER_RESET_SECONDS after ML_BREAKER_THRESHOLD
+# consecutive failed calls.
+ML_MAX_CONNECTIONS = int(os.getenv("ML_MAX_CONNECTIONS", 20))
+ML_CONNECT_TIMEOUT_SECONDS = float(os.getenv("ML_CONNECT_TIMEOUT_SECONDS", 5))
+ML_REQUEST_TIMEOUT_SECONDS = float(os.getenv("ML_REQUEST_TIMEOUT_SECONDS", 30))
+ML_RETRIES = int(os.getenv("ML_RETRIES", 3))
+ML_BACKOFF_BASE_SECONDS = float(os.getenv("ML_BACKOFF_BASE_SECONDS", 0.2))
+ML_BACKOFF_MAX_SECONDS = float(os.getenv("ML_BACKOFF_MAX_SECONDS", 5))
+ML_BREAKER_THRESHOLD = int(os.getenv("ML_BREAKER_THRESHOLD", 5))
+ML_BREAKER_RESET_SECONDS = float(os.getenv("ML_BREAKER_RESET_SECONDS", 30))
+
+# Score and publish flights by departure proximity (soonest first) instead of
+# merge order. SKIP_DEPARTED_FLIGHTS drops flights that have already left.
+PRIORITIZE_BY_DEPARTURE = os.getenv("PRIORITIZE_BY_DEPARTURE", "true").lower() == "true"
+SKIP_DEPARTED_FLIGHTS = os.getenv("SKIP_DEPARTED_FLIGHTS", "false").lower() == "true"
+
+# Prediction producer batching: messages are held up to KAFKA_LINGER_MS to
+# fill KAFKA_BATCH_SIZE-byte batches, compressed with KAFKA_COMPRESSION
+# (gzip, snappy, lz4, zstd or none; all but gzip need their python library).
+# One in-flight request per broker keeps per-flight order across retries.
+KAFKA_LINGER_MS = int(os.getenv("KAFKA_LINGER_MS", 50))
+KAFKA_BATCH_SIZE = int(os.getenv("KAFKA_BATCH_SIZE", 131072))
+KAFKA_COMPRESSION = os.getenv("KAFKA_COMPRESSION", "gzip")
+KAFKA_ACKS = os.getenv("KAFKA_ACKS", "all")
+KAFKA_RETRIES = int(os.getenv("KAFKA_RETRIES", 5))
+
+# Optional log-compacted topic holding the latest prediction per flight
+# (keyed by unique_key). Only changed predictions are written to it and
+# departed flights get tombstones. PREDICTION_CHANGES_ONLY also stops
+# re-sending unchanged predictions to PREDICTION_TOPIC (needs the state topic).
+PREDICTION_STATE_TOPIC = os.getenv("PREDICTION_STATE_TOPIC")
+PREDICTION_CHANGES_ONLY = os.getenv("PREDICTION_CHANGES_ONLY", "false").lower() == "true"
+
+# "batch" (default): watch_and_trigger.py runs flink_job.py once per flag file.
+# "daemon": batch_daemon.py stays resident (warm Flink env, preprocessors,
+# Kafka producer and ML client) and runs a batch whenever the flag appears.
+# "streaming": streaming_job.py reads both topics continuously, keeps
+# STREAM_LOOKBACK_HOURS of weather per airport and every upcoming flight in
+# memory, and every STREAM_TRIGGER_SECONDS scores flights that are new,
+# changed, or whose origin/destination weather changed.
+FLINK_MODE = os.getenv("FLINK_MODE", "batch")
+STREAM_TRIGGER_SECONDS = float(os.getenv("STREAM_TRIGGER_SECONDS", 5))
+STREAM_LOOKBACK_HOURS = float(os.getenv("STREAM_LOOKBACK_HOURS", 48))
+
+# Daemon mode waits for the flag with inotify; where that is unavailable it
+# polls every FLAG_POLL_SECONDS
+FLAG_POLL_SECONDS = float(os.getenv("FLAG_POLL_SECONDS", 1))
+
+# When set (e.g. /opt/flink/state/weather_features.pkl), weather hours already
+# transformed in an earlier batch with unchanged values reuse their stored
+# features, and the rest continue lag/rolling/forward-fill from the stored
+# rows before them. WEATHER_STATE_HOURS per airport are kept; it must cover
+# the backend's weather re-send window (24h back, from the start of that day).
+# Empty (default) disables it: every batch is transformed from its own rows.
+WEATHER_STATE_PATH = os.getenv("WEATHER_STATE_PATH", "")
+WEATHER_STATE_HOURS = float(os.getenv("WEATHER_STATE_HOURS", 72))
+
+# When set (e.g. /opt/flink/state/fingerprints.sqlite), batch mode keeps a
+# SQLite file of unique_key -> hash of the final stage 1/2 feature vectors and
+# the last prediction. Flights whose features hash the same get the stored
+# prediction instead of an ML call (and, with PREDICTION_CHANGES_ONLY, publish
+# nothing). Entries older than FINGERPRINT_TTL_HOURS are re-scored anyway.
+# The hash does not cover the ML service's model version: after activating a
+# new model, delete the file or stored predictions are served until they
+# expire. Empty (default) disables it.
+FINGERPRINT_STORE_PATH = os.getenv("FINGERPRINT_STORE_PATH", "")
+FINGERPRINT_TTL_HOURS = float(os.getenv("FINGERPRINT_TTL_HOURS", 6))
+
+# Memory budget in MB for one batch's flights. When set, flights are decoded
+# as Flink returns them and scored in departure-time partitions sized to stay
+# within it (each joined with only the weather it needs); 0 processes the
+# whole window at once. Every batch logs its peak RSS either way.
+PIPELINE_MEMORY_BUDGET_MB = float(os.getenv("PIPELINE_MEMORY_BUDGET_MB", 0))
@@ -0,0 +1,251 @@
+"""
+Continuous scoring: read the weather and flight topics as unbounded streams
+and re-score flights as soon as their inputs change, instead of re-reading
+both topics once per batch flag.
+
+Keyed state lives in memory:
+    weather  airport -> observation time -> latest record (STREAM_LOOKBACK_HOURS kept)
+    flights  (airline, departure, origin, destination) -> latest record, until departure
+
+Every STREAM_TRIGGER_SECONDS the flights that are new or changed, plus the
+flights whose origin or destination weather changed, are merged against
+their airports' weather history and scored with the same transformers,
+executor and publishing path as flink_job.py.
+
+    FLINK_MODE=streaming python streaming_job.py
+"""
+import asyncio
+import json
+import signal
+import threading
+import time
+
+import pandas as pd
+
+# The preprocessors are unpickled from __main__; the classes must be defined
+# there before stage_predictor (imported by flink_job) loads them
+from transformers.custom_transformers import (
+    DelayMinSmoother,
+    FeatureEngineeringTransformer,
+    OrdinalEncoderTransformer,
+)
+
+from flink_job import build_merged_frame, score_and_publish, create_table_env, open_prediction_state
+from utils.kafka_utils import flink_read, get_producer, DeliveryTracker
+from utils.logger import get_logger
+from utils.ml_client import ml_client
+
+from settings import (
+    WEATHER_TOPIC, FLIGHT_TOPIC,
+    STREAM_TRIGGER_SECONDS, STREAM_LOOKBACK_HOURS,
+)
+
+FLIGHT_KEY_FIELDS = ("airlineIataCode", "scheduledDepartureTime", "originAirportIata", "destinationAirportIata")
+
+
+def parse_payload(data):
+    """Records in one raw Kafka message (the producers send lists of records)"""
+    try:
+        payload = json.loads(data)
+    except (TypeError, ValueError):
+        return []
+    if isinstance(payload, dict):
+        return [payload]
+    return [record for record in payload if isinstance(record, dict)] if isinstance(payload, list) else []
+
+
+def to_utc(value):
+    timestamp = pd.to_datetime(value, errors="coerce", utc=True)
+    return None if pd.isna(timestamp) else timestamp
+
+
+# -----------------------------
+# KEYED STATE
+# -----------------------------
+class StreamState:
+    """Latest weather per airport/hour and latest record per flight"""
+
+    def __init__(self, lookback_hours: float):
+        self.lookback = pd.Timedelta(hours=lookback_hours)
+        self.weather = {}  # airport -> {timestamp: record}
+        self.flights = {}  # flight key -> record
+
+        self.dirty_flights = set()
+        self.dirty_airports = set()
+
+    def add_weather(self, record):
+        airport = record.get("iata_code")
+        observed = to_utc(record.get("datetime"))
+        if not airport or observed is None:
+            return
+
+        history = self.weather.setdefault(airport, {})
+        if history.get(observed) != record:
+            history[observed] = record
+            self.dirty_airports.add(airport)
+
+    def add_flight(self, record):
+        key = tuple(record.get(field) for field in FLIGHT_KEY_FIELDS)
+        if not all(key):
+            return
+
+        if self.flights.get(key) != record:
+            self.flights[key] = record
+            self.dirty_flights.add(key)
+
+    def prune(self, now):
+        """Drop weather older than the lookback window and flights that have departed"""
+        cutoff = now - self.lookback
+        for airport in list(self.weather):
+            history = self.weather[airport]
+            for observed in [t for t in history if t < cutoff]:
+                del history[observed]
+            if not history:
+                del self.weather[airport]
+
+        for key in list(self.flights):
+            departure = to_utc(key[1])
+            if departure is None or departure < now:
+                del self.flights[key]
+                self.dirty_flights.discard(key)
+
+    def take_due(self):
+        """Flights to re-score and the weather history they need; clears the dirty sets"""
+        due = {key for key in self.dirty_flights if key in self.flights}
+        if self.dirty_airports:
+            due.update(
+                key for key in self.flights
+                if key[2] in self.dirty_airports or key[3] in self.dirty_airports
+            )
+        self.dirty_flights.clear()
+        self.dirty_airports.clear()
+
+        airports = {airport for key in due for airport in (key[2], key[3])}
+        flight_pdf = pd.DataFrame([self.flights[key] for key in due])
+        weather_pdf = pd.DataFrame([
+            record
+            for airport in airports
+            for record in self.weather.get(airport, {}).values()
+        ])
+        return flight_pdf, weather_pdf
+
+    def stats(self):
+        return {
+            "airports": len(self.weather),
+            "weather_records": sum(len(history) for history in self.weather.values()),
+            "flights": len(self.flights),
+        }
+
+
+# -----------------------------
+# SOURCE
+# -----------------------------
+class StreamReader(threading.Thread):
+    """Collects (source, data) rows from the unbounded Flink query into a buffer"""
+
+    def __init__(self, table):
+        super().__init__(name="flink-stream-reader", daemon=True)
+        self.table = table
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.error = None
+
+    def run(self):
+        try:
+            with self.table.execute().collect() as results:
+                for row in results:
+                    with self.lock:
+                        self.buffer.append((row[0], row[1]))
+        except Exception as e:
+            self.error = e
+
+    def drain(self):
+        with self.lock:
+            rows, self.buffer = self.buffer, []
+        return rows
+
+
+def build_source(t_env):
+    """Both topics as one unbounded table of (source, data), starting a lookback window back"""
+    start_timestamp = int((time.time() - STREAM_LOOKBACK_HOURS * 3600) * 1000)
+    flink_read(t_env, WEATHER_TOPIC, group_id="flink-stream-consumer", bounded=False, start_timestamp=start_timestamp)
+    flink_read(t_env, FLIGHT_TOPIC, group_id="flink-stream-consumer", bounded=False, start_timestamp=start_timestamp)
+
+    return t_env.sql_query(f"""
+        SELECT 'weather' AS source, `data` FROM {WEATHER_TOPIC}_table
+        UNION ALL
+        SELECT 'flight' AS source, `data` FROM {FLIGHT_TOPIC}_table
+    """)
+
+
+# ==================================================
+#   STREAMING MAIN LOOP
+# ==================================================
+async def run_streaming():
+    logger = get_logger("FLINK_STREAM")
+
+    t_env = create_table_env()
+
+    reader = StreamReader(build_source(t_env))
+    reader.start()
+    logger.info(f"Streaming {WEATHER_TOPIC} and {FLIGHT_TOPIC}, scoring every {STREAM_TRIGGER_SECONDS:g}s")
+
+    producer = get_producer()
+    delivery = DeliveryTracker()
+
+    prediction_state = open_prediction_state()
+
+    state = StreamState(STREAM_LOOKBACK_HOURS)
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stopping.set)
+
+    while not stopping.is_set():
+        if reader.error is not None:
+            logger.error(f"Stream reader failed: {type(reader.error).__name__}: {reader.error}")
+            break
+
+        for source, data in reader.drain():
+            add = state.add_weather if source == "weather" else state.add_flight
+            for record in parse_payload(data):
+                add(record)
+
+        now = pd.Timestamp.now(tz="UTC")
+        state.prune(now)
+        flight_pdf, weather_pdf = state.take_due()
+
+        if not flight_pdf.empty and not weather_pdf.empty:
+            trigger_start = time.perf_counter()
+            try:
+                merged_df = build_merged_frame(weather_pdf, flight_pdf, logger)
+                if not merged_df.empty:
+                    counts = await score_and_publish(merged_df, producer, delivery, prediction_state, logger)
+                    logger.info(
+                        f"Trigger scored {counts['success']}/{counts['total']} flights "
+                        f"in {time.perf_counter() - trigger_start:.2f}s; state: {json.dumps(state.stats())}"
+                    )
+            except Exception as e:
+                logger.error(f"Trigger failed: {type(e).__name__}: {e}")
+
+            if prediction_state is not None:
+                prediction_state.tombstone_departed(delivery, producer, now=now)
+
+        try:
+            await asyncio.wait_for(stopping.wait(), STREAM_TRIGGER_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+    logger.info("Stopping streaming job...")
+    logger.info(f"ML client stats: {json.dumps(ml_client.stats())}")
+    await ml_client.close()
+
+    producer.flush()
+    producer.close()
+    logger.info(f"Kafka delivery stats: {json.dumps(delivery.stats())}")
+    if prediction_state is not None:
+        logger.info(f"Prediction state stats: {json.dumps(prediction_state.stats())}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_streaming())
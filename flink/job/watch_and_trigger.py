@@ -1,9 +1,11 @@
 import os
 import time
 import subprocess
-from settings import FLAG_PATH
+from settings import FLAG_PATH, FLINK_MODE
 
 FLINK_JOB_PATH = "/opt/flink/job/flink_job.py"
+STREAMING_JOB_PATH = "/opt/flink/job/streaming_job.py"
+DAEMON_JOB_PATH = "/opt/flink/job/batch_daemon.py"
 INTERVAL = 10       #10 seconds
 
 
@@ -22,5 +24,22 @@ def watch_and_trigger():
         time.sleep(INTERVAL)  # check every 10 seconds
 
 
+def run_streaming():
+    # Long-running: the streaming job scores on its own triggers, no flag needed
+    print("FLINK_MODE=streaming. Starting continuous Flink job...")
+    subprocess.run(["/opt/flink/venv/bin/python3", STREAMING_JOB_PATH])
+
+
+def run_daemon():
+    # One warm process handles every flag itself
+    print("FLINK_MODE=daemon. Starting resident Flink batch worker...")
+    subprocess.run(["/opt/flink/venv/bin/python3", DAEMON_JOB_PATH])
+
+
 if __name__ == "__main__":
-    watch_and_trigger()
+    if FLINK_MODE == "streaming":
+        run_streaming()
+    elif FLINK_MODE == "daemon":
+        run_daemon()
+    else:
+        watch_and_trigger()
@@ -1,10 +1,13 @@
 import json
 import joblib
 import asyncio
-import aiohttp
 import numpy as np
 import pandas as pd
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
+
+from utils.wire_utils import MEDIA_TYPE, encode_blocks, decode_blocks
+from utils.feature_schema import SCHEMA_HEADER, SCHEMA_VERSION, INTEGER_FEATURES
+from utils.ml_client import ml_client, MLHTTPError
 
 
 
@@ -14,6 +17,7 @@ preprocessor2 = joblib.load("/opt/flink/preprocessors/stage2_preprocessor.joblib
 
 ML_API_STAGE1 = "http://ml:6000/predict/stage1"
 ML_API_STAGE2 = "http://ml:6000/predict/stage2"
+ML_API_CASCADE_BINARY = "http://ml:6000/predict/cascade/binary"
 
 
 # -----------------------------
@@ -21,27 +25,37 @@ ML_API_STAGE2 = "http://ml:6000/predict/stage2"
 # -----------------------------
 async def call_api(url: str, data: Dict[str, Any]):
     """Call ML API with proper error handling"""
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.post(
-                url,
-                json=data,
-                headers={"Content-Type": "application/json"},
-                timeout=aiohttp.ClientTimeout(total=30)
-            ) as resp:
-                response_text = await resp.text()
-
-                if resp.status != 200:
-                    print(f"[API ERROR] Status {resp.status}: {response_text}")
-                    return {"error": f"HTTP {resp.status}", "detail": response_text}
-
-                return await resp.json()
-        except asyncio.TimeoutError:
-            print(f"[API ERROR] Request timeout")
-            return {"error": "Timeout"}
-        except Exception as e:
-            print(f"[API ERROR] {type(e).__name__}: {e}")
-            return {"error": str(e)}
+    try:
+        body = await ml_client.post(url, json=data)
+        return json.loads(body)
+    except MLHTTPError as e:
+        print(f"[API ERROR] Status {e.status}: {e.detail}")
+        return {"error": f"HTTP {e.status}", "detail": e.detail}
+    except asyncio.TimeoutError:
+        print(f"[API ERROR] Request timeout")
+        return {"error": "Timeout"}
+    except Exception as e:
+        print(f"[API ERROR] {type(e).__name__}: {e}")
+        return {"error": str(e)}
+
+async def call_api_binary(url: str, blocks: List[np.ndarray]):
+    """Call a binary ML endpoint; returns the decoded response columns or an error dict"""
+    try:
+        body = await ml_client.post(
+            url,
+            data=encode_blocks(blocks),
+            headers={"Content-Type": MEDIA_TYPE, SCHEMA_HEADER: SCHEMA_VERSION},
+        )
+        return [block.ravel() for block in decode_blocks(body)]
+    except MLHTTPError as e:
+        print(f"[API ERROR] Status {e.status}: {e.detail[:200]}")
+        return {"error": f"HTTP {e.status}", "detail": e.detail}
+    except asyncio.TimeoutError:
+        print(f"[API ERROR] Request timeout")
+        return {"error": "Timeout"}
+    except Exception as e:
+        print(f"[API ERROR] {type(e).__name__}: {e}")
+        return {"error": str(e)}
 
 # -----------------------------
 # HELPER: CLEAN VALUES
@@ -102,6 +116,69 @@ def prepare_payload(transformed_df: pd.DataFrame, expected_cols: List[str]) -> D
     return ordered_dict
 
 
+# -----------------------------
+# PREPARE FEATURE MATRIX FOR API
+# -----------------------------
+def prepare_matrix(transformed_df: pd.DataFrame, expected_cols: List[str]) -> np.ndarray:
+    """
+    Vectorized prepare_payload for a whole preprocessed DataFrame
+
+    Returns:
+        float32 matrix with columns in expected_cols order, missing
+        columns and NaN/Inf values replaced with 0.0, and INTEGER_FEATURES
+        rounded to whole numbers (the ML service rejects a whole chunk
+        over one fractional value there)
+    """
+    missing = [col for col in expected_cols if col not in transformed_df.columns]
+    if missing:
+        print(f"[WARNING] Missing columns {missing}, setting to 0.0")
+
+    X = (
+        transformed_df.reindex(columns=expected_cols, fill_value=0.0)
+        .apply(pd.to_numeric, errors="coerce")
+        .to_numpy(dtype=np.float64)
+    )
+    X = np.nan_to_num(X, nan=0.0, posinf=0.0, neginf=0.0)
+
+    integer_columns = [i for i, col in enumerate(expected_cols) if col in INTEGER_FEATURES]
+    X[:, integer_columns] = np.rint(X[:, integer_columns])
+
+    return X.astype(np.float32)
+
+
+# -----------------------------
+# PREPARE WHOLE BATCH FOR API
+# -----------------------------
+def prepare_batch(
+    records_df: pd.DataFrame,
+    expected_cols_stage1: List[str],
+    expected_cols_stage2: List[str]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Run each preprocessor once over all records instead of once per row
+
+    Args:
+        records_df: Raw merged flight/weather rows
+        expected_cols_stage1: Feature names for stage 1 model
+        expected_cols_stage2: Feature names for stage 2 model
+
+    Returns:
+        Stage 1 and stage 2 feature matrices, row-aligned with records_df
+    """
+    # The preprocessors may reset the index, so hand them a clean one
+    records_df = records_df.reset_index(drop=True)
+
+    X1 = prepare_matrix(preprocessor1.transform(records_df), expected_cols_stage1)
+    X2 = prepare_matrix(preprocessor2.transform(records_df), expected_cols_stage2)
+
+    if len(X1) != len(records_df) or len(X2) != len(records_df):
+        raise ValueError(
+            f"Preprocessing changed the row count: {len(records_df)} in, {len(X1)}/{len(X2)} out"
+        )
+
+    return X1, X2
+
+
 # -----------------------------
 # MAIN PROCESSOR
 # -----------------------------
@@ -193,3 +270,26 @@ async def process_record(
             "error": str(e),
             "error_type": type(e).__name__
         }
+
+
+# -----------------------------
+# BINARY MATRIX CASCADE
+# -----------------------------
+async def process_matrix_remote(X1: np.ndarray, X2: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    Score preprocessed stage 1 / stage 2 matrices through the server-side
+    cascade using the binary wire format
+
+    Returns:
+        One prediction result per row, in the same order
+    """
+    response = await call_api_binary(ML_API_CASCADE_BINARY, [X1, X2])
+
+    if isinstance(response, dict):
+        return [{"error": "Cascade API failed", "result": response} for _ in range(len(X1))]
+
+    stages, predictions = response
+    return [
+        {"stage": int(stage), "prediction": int(prediction)}
+        for stage, prediction in zip(stages, predictions)
+    ]
@@ -118,10 +118,11 @@ class FeatureEngineeringTransformer(BaseEstimator, TransformerMixin):
         df["route_adj_delay_mean"] = df["route"].map(self.route_adj_delay_mean_).fillna(self.global_adjusted_delay_mean_)
         df["airline_adj_delay_mean"] = df["airline_name"].map(self.airline_adj_delay_mean_).fillna(self.global_adjusted_delay_mean_)
 
-        df["route_airline_adj_delay_mean"] = df.apply(
-            lambda r: self.route_airline_adj_delay_mean_.get((r["airline_name"], r["route"]), np.nan),
-            axis=1
-        )
+        # Plain dict lookups over zipped columns; df.apply(axis=1) builds a Series per row
+        df["route_airline_adj_delay_mean"] = [
+            self.route_airline_adj_delay_mean_.get(key, np.nan)
+            for key in zip(df["airline_name"], df["route"])
+        ]
         df["route_airline_adj_delay_mean"] = df["route_airline_adj_delay_mean"].fillna(self.global_adjusted_delay_mean_)
         # --- 2. Temporal encodings ---
         if self.sched_dep_month_enc_:
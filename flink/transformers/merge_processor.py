@@ -3,6 +3,9 @@ from utils.logger import get_logger
 
 logger = get_logger("MERGE_PROCESSOR")
 
+# Furthest a weather observation may be from the departure/arrival time it is matched to
+WEATHER_MATCH_TOLERANCE = pd.Timedelta('2h')
+
 def create_route(df: pd.DataFrame, logger) -> pd.DataFrame:
     """Combines origin and dest to create route"""
     logger.info("Creating route column...")
@@ -46,7 +49,7 @@ def merge_weather_forecast_serving(
         left_by='originIata',
         right_by='airport_iata',
         direction='nearest',
-        tolerance=pd.Timedelta('2h')
+        tolerance=WEATHER_MATCH_TOLERANCE
     )
 
     logger.info(f"{flights_with_origin.shape[0]:,} records left")
@@ -64,7 +67,7 @@ def merge_weather_forecast_serving(
         left_by='destIata',
         right_by='airport_iata',
         direction='nearest',
-        tolerance=pd.Timedelta('2h')
+        tolerance=WEATHER_MATCH_TOLERANCE
     )
 
     merged_data = flights_with_both.copy()
@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 
+from utils.weather_state import CONTEXT_COLUMN, HASH_COLUMN, raw_row_hashes
+
 # 1. Categorize rainfall intensity
 def categorize_rain(mm: float) -> str:
     """Categorize rainfall intensity by mm."""
@@ -19,11 +21,17 @@ def categorize_rain(mm: float) -> str:
         return "very_heavy"
 
 # 2. Transform Weather Data for Serving
-def transform_weather_data_serving(df: pd.DataFrame, logger) -> pd.DataFrame:
+def transform_weather_data_serving(df: pd.DataFrame, logger, state=None) -> pd.DataFrame:
     """
     Clean, enrich, and engineer features from weather data for INFERENCE.
     This function is adapted for serving, ensuring no data leakage and handling
     potential missing columns or different data distributions.
+
+    With a WeatherFeatureState, hours already transformed in an earlier batch
+    with the same raw values get their stored features back. The remaining
+    rows are transformed after the stored rows just before them, so
+    lag/rolling/forward-fill continue across batches. The state is then
+    updated with the new rows.
     """
     df = df.copy()
     logger.info("Sorting data and handling outliers...")
@@ -50,6 +58,18 @@ def transform_weather_data_serving(df: pd.DataFrame, logger) -> pd.DataFrame:
     # Ensure datetime format
     df["datetime"] = pd.to_datetime(df["datetime"])
 
+    reused = None
+    if state is not None:
+        df[HASH_COLUMN] = raw_row_hashes(df)
+        reused, context, df = state.split(df)
+        logger.info(f"Reusing features for {len(reused)} unchanged weather rows, computing {len(df)}...")
+        if df.empty:
+            return _without_state_columns(reused)
+
+        df[CONTEXT_COLUMN] = False
+        if not context.empty:
+            df = pd.concat([context.assign(**{CONTEXT_COLUMN: True}), df], ignore_index=True)
+
     # Sort is critical for shift/rolling to work correctly
     df = df.sort_values(["airport_iata", "datetime"]).reset_index(drop=True)
 
@@ -59,11 +79,14 @@ def transform_weather_data_serving(df: pd.DataFrame, logger) -> pd.DataFrame:
     logger.info("Forward-filling missing values using historical context...")
 
 
-    if "airport_icao" in df.columns:
-        df = df.groupby("airport_icao", group_keys=False).ffill()
-    else:
-        # Fallback if ICAO is missing
-        df = df.groupby("airport_iata", group_keys=False).ffill()
+    # Fallback to IATA if ICAO is missing
+    group_key = "airport_icao" if "airport_icao" in df.columns else "airport_iata"
+    filled = df.groupby(group_key, group_keys=False).ffill()
+
+    if state is not None:
+        # Keep the group key (ffill drops it) so stored rows can be prepended later
+        state.update_filled(filled.assign(**{group_key: df[group_key]}))
+    df = filled
 
     # Create Grouper for rolling ops
     grouped = df.groupby("airport_iata", group_keys=False)
@@ -116,5 +139,15 @@ def transform_weather_data_serving(df: pd.DataFrame, logger) -> pd.DataFrame:
     df["high_wind_flag"] = (df["wind_speed_kmph"] > 50).astype(int)
     df["high_humidity_flag"] = (df["humidity_pct"] > 60).astype(int)
 
+    if state is not None:
+        df = df[~df[CONTEXT_COLUMN].astype(bool)].drop(columns=[CONTEXT_COLUMN])
+        state.update_features(df)
+        df = _without_state_columns(pd.concat([reused, df], ignore_index=True))
+
     logger.info("Weather data transformation complete.")
     return df
+
+
+def _without_state_columns(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.drop(columns=[c for c in (CONTEXT_COLUMN, HASH_COLUMN) if c in df.columns])
+    return df.sort_values(["airport_iata", "datetime"]).reset_index(drop=True)
@@ -0,0 +1,242 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+_DONE = object()
+
+
+class DeadlineExceeded(Exception):
+    """The work item was shed because it could not finish before the batch deadline"""
+
+
+# -----------------------------
+# ADAPTIVE CONCURRENCY
+# -----------------------------
+class AIMDLimiter:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit.
+
+    While calls succeed at close to the best latency seen so far and the
+    window is full, the limit grows by about one per window of completions.
+    A failed call halves it; a smoothed latency above latency_tolerance x
+    the best latency shrinks it by 10%. At most one decrease happens per
+    round trip, so one burst of slow calls is only counted once.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        latency_tolerance: float = 2.0,
+        error_ratio: float = 0.5,
+        latency_ratio: float = 0.9,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.latency_tolerance = latency_tolerance
+        self.error_ratio = error_ratio
+        self.latency_ratio = latency_ratio
+
+        self.in_flight = 0
+        self.min_latency: Optional[float] = None
+        self.smoothed_latency: Optional[float] = None
+        self.last_decrease = 0.0
+        self.increases = 0
+        self.decreases = 0
+        self.peak_limit = int(self.limit)
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, latency: float, failed: bool):
+        async with self._condition:
+            # Limit-bound means the window was full when this call finished
+            limited = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            self._adjust(latency, failed, limited)
+            self._condition.notify_all()
+
+    def _adjust(self, latency: float, failed: bool, limited: bool):
+        if not failed:
+            self.min_latency = latency if self.min_latency is None else min(self.min_latency, latency)
+            self.smoothed_latency = (
+                latency if self.smoothed_latency is None
+                else 0.8 * self.smoothed_latency + 0.2 * latency
+            )
+
+        slow = (
+            self.smoothed_latency is not None
+            and self.smoothed_latency > self.min_latency * self.latency_tolerance
+        )
+
+        if failed or slow:
+            now = time.monotonic()
+            if now - self.last_decrease >= (self.smoothed_latency or latency):
+                ratio = self.error_ratio if failed else self.latency_ratio
+                self.limit = max(self.min_limit, self.limit * ratio)
+                self.last_decrease = now
+                self.decreases += 1
+        elif limited and self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.increases += 1
+            self.peak_limit = max(self.peak_limit, int(self.limit))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "peak_limit": self.peak_limit,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "min_latency_ms": round(self.min_latency * 1000, 2) if self.min_latency else None,
+            "smoothed_latency_ms": round(self.smoothed_latency * 1000, 2) if self.smoothed_latency else None,
+        }
+
+
+# -----------------------------
+# EXECUTOR
+# -----------------------------
+class BoundedExecutor:
+    """
+    Sliding-window executor: a fixed pool of workers keeps up to
+    `concurrency` calls in flight and hands each result to a single sink
+    as soon as it completes, so one slow call never holds back the rest.
+
+    Results wait in a bounded queue. If the sink (e.g. the Kafka producer)
+    falls behind, workers block on that queue and stop starting new calls;
+    if the ML service slows down, fewer calls complete and the window simply
+    stays full. Either way memory and in-flight work stay bounded.
+
+    With a limiter, the pool is sized for limiter.max_limit and the limiter
+    decides how many of those workers may have a call in flight.
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        max_pending_results: Optional[int] = None,
+        limiter: Optional[AIMDLimiter] = None,
+    ):
+        self.limiter = limiter
+        self.concurrency = limiter.max_limit if limiter else max(1, concurrency)
+        self.max_pending_results = max_pending_results or self.concurrency * 2
+
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.shed = 0
+
+    async def run(
+        self,
+        items: Iterable[Any],
+        work: Callable[[Any], Awaitable[Any]],
+        sink: Callable[[Any, Any], Any],
+        deadline: Optional[float] = None,
+        is_failure: Optional[Callable[[Any], bool]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run work(item) for every item and call sink(item, outcome) in completion order
+
+        Args:
+            items: Work items; consumed lazily, so a generator never gets ahead of the window
+            work: Coroutine function producing the result for one item
+            sink: Receives each item with its result, or with the exception work raised.
+                May be a plain function or a coroutine function.
+            deadline: time.monotonic() by which all work must be done. Items not
+                started in time, and calls still running at the deadline, are
+                shed: the sink receives DeadlineExceeded for them.
+            is_failure: Tells the limiter a returned result was a failure
+                (exceptions always are)
+
+        Returns:
+            Executor stats for the run
+        """
+        iterator = iter(items)
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.max_pending_results)
+        start = time.perf_counter()
+
+        async def call(item):
+            if self.limiter is not None:
+                await self.limiter.acquire()
+
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            started = time.perf_counter()
+            failed = True
+            try:
+                outcome = await work(item)
+                failed = bool(is_failure and is_failure(outcome))
+                return outcome
+            finally:
+                self.in_flight -= 1
+                if self.limiter is not None:
+                    await self.limiter.release(time.perf_counter() - started, failed)
+
+        async def worker():
+            for item in iterator:
+                try:
+                    if deadline is None:
+                        outcome = await call(item)
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise DeadlineExceeded("Batch deadline passed before the call started")
+                        try:
+                            outcome = await asyncio.wait_for(call(item), remaining)
+                        except asyncio.TimeoutError:
+                            raise DeadlineExceeded("Call still running at the batch deadline")
+                except DeadlineExceeded as e:
+                    self.shed += 1
+                    outcome = e
+                except Exception as e:
+                    outcome = e
+
+                # Blocks while the sink is behind: backpressure
+                await results.put((item, outcome))
+            await results.put(_DONE)
+
+        async def drain():
+            remaining = self.concurrency
+            while remaining:
+                entry = await results.get()
+                if entry is _DONE:
+                    remaining -= 1
+                    continue
+
+                item, outcome = entry
+                if isinstance(outcome, Exception):
+                    self.failed += 1
+                else:
+                    self.completed += 1
+
+                handled = sink(item, outcome)
+                if asyncio.iscoroutine(handled):
+                    await handled
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(self.concurrency)]
+        try:
+            await asyncio.gather(drain(), *workers)
+        except BaseException:
+            for task in workers:
+                task.cancel()
+            raise
+
+        return self.stats(time.perf_counter() - start)
+
+    def stats(self, elapsed: float) -> Dict[str, Any]:
+        stats = {
+            "concurrency": self.concurrency,
+            "completed": self.completed,
+            "failed": self.failed,
+            "shed": self.shed,
+            "peak_in_flight": self.peak_in_flight,
+            "elapsed_s": round(elapsed, 3),
+        }
+        if self.limiter is not None:
+            stats["limiter"] = self.limiter.stats()
+        return stats
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+from utils.prediction_state import departure_from_key
+
+
+def fingerprint_rows(*matrices: np.ndarray) -> List[str]:
+    """Hash of each row's final feature values across the given row-aligned matrices"""
+    rows = np.ascontiguousarray(np.hstack([np.asarray(m, dtype=np.float64) for m in matrices]))
+    return [hashlib.blake2b(row.tobytes(), digest_size=16).hexdigest() for row in rows]
+
+
+class FingerprintStore:
+    """
+    unique_key -> (feature fingerprint, last prediction), in a local SQLite file.
+
+    A flight whose stage 1 and stage 2 feature vectors hash the same as when
+    it was last scored gets its stored prediction back instead of an ML call.
+    Entries expire after ttl_hours so every flight is still re-scored now and
+    then, and are dropped once the flight departs. The fingerprint does not
+    cover the model version, so the file has to be removed when a new model
+    is activated.
+    """
+
+    def __init__(self, path: str, ttl_hours: float = 6.0):
+        self.path = path
+        self.ttl_s = ttl_hours * 3600
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                unique_key TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                result TEXT NOT NULL,
+                departure REAL,
+                scored_at REAL NOT NULL
+            )
+            """
+        )
+        self.db.commit()
+
+    def lookup(self, keys: List[str], fingerprints: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Stored results for the keys whose fingerprint is unchanged and not expired"""
+        fresh_after = time.time() - self.ttl_s
+        wanted = dict(zip(keys, fingerprints))
+        found: Dict[str, Dict[str, Any]] = {}
+
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            chunk = keys[i : i + 500]
+            rows = self.db.execute(
+                f"SELECT unique_key, fingerprint, result FROM fingerprints "
+                f"WHERE scored_at >= ? AND unique_key IN ({','.join('?' * len(chunk))})",
+                [fresh_after, *chunk],
+            )
+            for unique_key, fingerprint, result in rows:
+                if wanted[unique_key] == fingerprint:
+                    found[unique_key] = json.loads(result)
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, entries: Iterable[tuple]):
+        """Record (unique_key, fingerprint, result) for successfully scored flights"""
+        now = time.time()
+        rows = []
+        for unique_key, fingerprint, result in entries:
+            departure = departure_from_key(unique_key)
+            rows.append((
+                unique_key,
+                fingerprint,
+                json.dumps({"stage": result.get("stage"), "prediction": result.get("prediction")}),
+                departure.timestamp() if departure is not None else None,
+                now,
+            ))
+        self.db.executemany("INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?, ?)", rows)
+        self.db.commit()
+
+    def prune(self) -> int:
+        """Drop departed flights and expired entries"""
+        now = time.time()
+        cursor = self.db.execute(
+            "DELETE FROM fingerprints WHERE departure < ? OR scored_at < ?",
+            (now, now - self.ttl_s),
+        )
+        self.db.commit()
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        (entries,) = self.db.execute("SELECT COUNT(*) FROM fingerprints").fetchone()
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self.db.close()
+
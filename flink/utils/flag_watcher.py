@@ -0,0 +1,109 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import time
+from pathlib import Path
+from typing import Optional
+
+from utils.logger import get_logger
+
+logger = get_logger("FLAG_WATCHER")
+
+# <linux/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+
+# With inotify, still re-check the path this often in case an event was missed
+RECHECK_SECONDS = 30
+
+
+def read_flag_timestamp(path) -> Optional[int]:
+    """The batch timestamp in the flag file, or None while it is missing, empty or partly written"""
+    try:
+        content = Path(path).read_text().strip()
+    except OSError:
+        return None
+    return int(content) if content.isdigit() else None
+
+
+class FlagWatcher:
+    """
+    Blocks until the batch flag file holds a batch timestamp.
+
+    The backend writes the flag with writeFileSync (open/truncate, then
+    write), so the file exists before its content does. The flag only
+    counts once it parses as a non-empty integer timestamp, as
+    get_batch_timestamp expects; an empty flag would make the batch read
+    the topics from the earliest offset.
+
+    Uses inotify on the flag's directory, so the flag is re-checked as soon
+    as the backend finishes writing it (IN_CLOSE_WRITE / IN_MOVED_TO)
+    instead of on the next poll. Falls back to polling every poll_seconds
+    where inotify is unavailable (non-Linux, or the directory is missing).
+    """
+
+    def __init__(self, path, poll_seconds: float = 1.0):
+        self.path = Path(path)
+        self.poll_seconds = poll_seconds
+        self._fd: Optional[int] = None
+        self._open_inotify()
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._fd is not None else "poll"
+
+    def _open_inotify(self):
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            return
+        try:
+            libc = ctypes.CDLL(libc_name, use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK)
+            if fd < 0:
+                return
+            wd = libc.inotify_add_watch(
+                fd, str(self.path.parent).encode(), IN_CLOSE_WRITE | IN_MOVED_TO
+            )
+            if wd < 0:
+                os.close(fd)
+                logger.warning(f"inotify watch on {self.path.parent} failed (errno {ctypes.get_errno()}), polling instead")
+                return
+        except (OSError, AttributeError):
+            return
+        self._fd = fd
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for a complete flag file
+
+        Returns:
+            True once the flag holds a timestamp, False if timeout passed first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while read_flag_timestamp(self.path) is None:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+
+            if self._fd is None:
+                time.sleep(self.poll_seconds if remaining is None else min(self.poll_seconds, remaining))
+                continue
+
+            # Only wake once a write is complete: not on IN_CREATE, which comes before it.
+            # The content is still checked by the loop, never trusted from the event alone
+            wait_s = RECHECK_SECONDS if remaining is None else min(RECHECK_SECONDS, remaining)
+            readable, _, _ = select.select([self._fd], [], [], wait_s)
+            if readable:
+                try:
+                    os.read(self._fd, 4096)
+                except BlockingIOError:
+                    pass
+        return True
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -41,3 +41,46 @@ def flatten_json_column(df):
         df = pd.json_normalize(df["f0"])
 
     return df
+
+
+def prioritize_by_departure(df, now=None, skip_departed=False):
+    """
+    Order flights by how soon they depart, so imminent departures are
+    scored and published first.
+
+    Args:
+        df (pd.DataFrame): Merged flights with a datetime sched_dep_time column
+        now (pd.Timestamp): Reference time (defaults to the current UTC time)
+        skip_departed (bool): Drop flights whose departure has already passed
+            instead of queueing them after the upcoming ones
+
+    Returns:
+        pd.DataFrame: Upcoming flights soonest first, then departed flights
+        (most recent first), then flights without a departure time
+    """
+    dep = pd.to_datetime(df["sched_dep_time"], errors="coerce")
+
+    # unique_key formats sched_dep_time as UTC ("...Z"); compare in UTC
+    now = now if now is not None else pd.Timestamp.now(tz="UTC")
+    if dep.dt.tz is None:
+        now = now.tz_convert("UTC").tz_localize(None) if now.tzinfo else now
+    elif now.tzinfo is None:
+        now = now.tz_localize("UTC")
+
+    minutes_to_departure = (dep - now).dt.total_seconds() / 60
+    departed = minutes_to_departure < 0
+
+    if skip_departed:
+        skipped = int(departed.sum())
+        if skipped:
+            logger.info(f"Skipping {skipped} flights that have already departed")
+        df, minutes_to_departure, departed = df[~departed], minutes_to_departure[~departed], departed[~departed]
+
+    # Upcoming (0), then departed (1), then unknown (2); closest to now first
+    group = departed.astype(int).where(minutes_to_departure.notna(), 2)
+    order = pd.DataFrame({
+        "group": group,
+        "distance": minutes_to_departure.abs(),
+    }, index=df.index).sort_values(["group", "distance"], kind="stable")
+
+    return df.loc[order.index].reset_index(drop=True)
@@ -1,9 +1,19 @@
 import json
 import os
+import threading
 from kafka import KafkaProducer, KafkaConsumer
+from kafka.admin import KafkaAdminClient, NewTopic
+from kafka.errors import TopicAlreadyExistsError
 from pyflink.table import StreamTableEnvironment
 from dotenv import load_dotenv
-from job.settings import FLAG_PATH
+from job.settings import (
+    FLAG_PATH,
+    KAFKA_LINGER_MS,
+    KAFKA_BATCH_SIZE,
+    KAFKA_COMPRESSION,
+    KAFKA_ACKS,
+    KAFKA_RETRIES,
+)
 
 
 BOOTSTRAP = "kafka:9092"
@@ -16,11 +26,93 @@ BOOTSTRAP = "kafka:9092"
 def get_producer():
     return KafkaProducer(
         bootstrap_servers=BOOTSTRAP,
-        value_serializer=lambda v: json.dumps(v).encode("utf-8"),
-        key_serializer=lambda v: v.encode("utf-8") if v else None
+        # None stays None so compacted topics receive real tombstones
+        value_serializer=lambda v: json.dumps(v).encode("utf-8") if v is not None else None,
+        key_serializer=lambda v: v.encode("utf-8") if v else None,
+        linger_ms=KAFKA_LINGER_MS,
+        batch_size=KAFKA_BATCH_SIZE,
+        compression_type=None if KAFKA_COMPRESSION == "none" else KAFKA_COMPRESSION,
+        acks=int(KAFKA_ACKS) if KAFKA_ACKS.isdigit() else KAFKA_ACKS,
+        retries=KAFKA_RETRIES,
+        max_in_flight_requests_per_connection=1,
     )
 
 
+# -------------------------
+# Compacted topic
+# -------------------------
+def ensure_compacted_topic(topic, partitions=3, replication_factor=1):
+    """Create a log-compacted topic if it doesn't exist yet"""
+    admin = KafkaAdminClient(bootstrap_servers=BOOTSTRAP)
+    try:
+        admin.create_topics([
+            NewTopic(
+                name=topic,
+                num_partitions=partitions,
+                replication_factor=replication_factor,
+                topic_configs={
+                    "cleanup.policy": "compact",
+                    # Let tombstones and superseded values go within a day
+                    "delete.retention.ms": "86400000",
+                    "min.cleanable.dirty.ratio": "0.1",
+                    "segment.ms": "3600000",
+                },
+            )
+        ])
+        print(f"[INFO] Created compacted topic '{topic}'")
+    except TopicAlreadyExistsError:
+        pass
+    finally:
+        admin.close()
+
+
+# -------------------------
+# Delivery tracking
+# -------------------------
+class DeliveryTracker:
+    """
+    Counts delivery results reported asynchronously by the producer.
+
+    Callbacks run on the producer's I/O thread, hence the lock.
+    """
+
+    def __init__(self, max_logged_failures=20):
+        self._lock = threading.Lock()
+        self.max_logged_failures = max_logged_failures
+        self.sent = 0
+        self.delivered = 0
+        self.failed = 0
+
+    def send(self, producer, topic, key, value):
+        """Send one keyed message and track its delivery without waiting for it"""
+        future = producer.send(topic, key=key, value=value)
+        with self._lock:
+            self.sent += 1
+        future.add_callback(self._on_delivered)
+        future.add_errback(self._on_failed, key)
+        return future
+
+    def _on_delivered(self, metadata):
+        with self._lock:
+            self.delivered += 1
+
+    def _on_failed(self, key, exc):
+        with self._lock:
+            self.failed += 1
+            log = self.failed <= self.max_logged_failures
+        if log:
+            print(f"[KAFKA ERROR] Delivery failed for {key}: {exc}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sent": self.sent,
+                "delivered": self.delivered,
+                "failed": self.failed,
+                "pending": self.sent - self.delivered - self.failed,
+            }
+
+
 # -------------------------
 # Consumer
 # -------------------------
@@ -84,15 +176,22 @@ def get_batch_timestamp(buffer_minutes=2):
 # -------------------------
 # Flink Kafka Table Source
 # -------------------------
-def flink_read(t_env: StreamTableEnvironment, topic, group_id="flink-batch-consumer"):
+def flink_read(t_env: StreamTableEnvironment, topic, group_id="flink-batch-consumer",
+               bounded=True, start_timestamp=None):
 
     """
     Create a Kafka source table using SQL DDL (modern PyFlink approach)
+
+    Args:
+        bounded: Stop at the latest offset (batch) or keep reading (streaming)
+        start_timestamp: Millisecond timestamp to start from; defaults to the
+            batch timestamp in the flag file
     """
     table_name = f"{topic}_table"
 
     # Get batch timestamp from flag file
-    start_timestamp = get_batch_timestamp(buffer_minutes=2)
+    if start_timestamp is None:
+        start_timestamp = get_batch_timestamp(buffer_minutes=2)
 
     if start_timestamp is not None:
         startup_config = f"""
@@ -105,6 +204,11 @@ def flink_read(t_env: StreamTableEnvironment, topic, group_id="flink-batch-consu
         startup_config = "'scan.startup.mode' = 'earliest-offset'"
         print(f"[WARNING] Topic '{topic}': No timestamp found, reading from earliest")
 
+    bounded_config = ",\n            'scan.bounded.mode' = 'latest-offset'" if bounded else ""
+
+    # A resident process reads again with a new start offset: replace the table
+    t_env.execute_sql(f"DROP TABLE IF EXISTS {table_name}")
+
     # Create Kafka source table with SQL DDL
     kafka_ddl = f"""
         CREATE TABLE {table_name} (
@@ -115,8 +219,7 @@ def flink_read(t_env: StreamTableEnvironment, topic, group_id="flink-batch-consu
             'properties.bootstrap.servers' = '{BOOTSTRAP}',
             'properties.group.id' = '{group_id}',
             'format' = 'raw',
-            {startup_config},
-            'scan.bounded.mode' = 'latest-offset'
+            {startup_config}{bounded_config}
         )
     """
 
@@ -0,0 +1,75 @@
+import os
+import resource
+import threading
+from typing import Optional
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        # No procfs: fall back to the lifetime peak (kilobytes on Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MemoryMonitor:
+    """
+    Samples the process RSS in a background thread and keeps the peak.
+
+    ru_maxrss only ever grows over the life of the process, so in a resident
+    worker it cannot tell one batch's peak from another's; one monitor is
+    started per batch and peak_bytes covers that whole batch. mark() opens a
+    nested window (e.g. one partition) whose own peak is mark_peak_bytes,
+    without touching the batch peak.
+    """
+
+    def __init__(self, interval_s: float = 0.05):
+        self.interval_s = interval_s
+        self.start_bytes = rss_bytes()
+        self.peak_bytes = self.start_bytes
+        self.mark_peak_bytes = self.start_bytes
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "MemoryMonitor":
+        self._thread = threading.Thread(target=self._sample, name="memory-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self.interval_s):
+            self._observe(rss_bytes())
+
+    def _observe(self, current: int):
+        self.peak_bytes = max(self.peak_bytes, current)
+        self.mark_peak_bytes = max(self.mark_peak_bytes, current)
+
+    def mark(self) -> int:
+        """Start a new window peak (mark_peak_bytes) from the current RSS, which is returned"""
+        current = rss_bytes()
+        self._observe(current)
+        self.mark_peak_bytes = current
+        return current
+
+    def mark_peak(self) -> int:
+        """Peak RSS since the last mark(), including the current RSS"""
+        self._observe(rss_bytes())
+        return self.mark_peak_bytes
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._observe(rss_bytes())
+
+    def stats(self):
+        mb = 1024 * 1024
+        return {
+            "start_rss_mb": round(self.start_bytes / mb, 1),
+            "peak_rss_mb": round(self.peak_bytes / mb, 1),
+            "end_rss_mb": round(rss_bytes() / mb, 1),
+        }
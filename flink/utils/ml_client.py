@@ -0,0 +1,253 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+import numpy as np
+
+from job.settings import (
+    ML_MAX_CONNECTIONS,
+    ML_CONNECT_TIMEOUT_SECONDS,
+    ML_REQUEST_TIMEOUT_SECONDS,
+    ML_RETRIES,
+    ML_BACKOFF_BASE_SECONDS,
+    ML_BACKOFF_MAX_SECONDS,
+    ML_BREAKER_THRESHOLD,
+    ML_BREAKER_RESET_SECONDS,
+)
+
+
+# Worth another attempt: the service is overloaded, restarting or behind a proxy hiccup
+RETRY_STATUSES = {429, 502, 503, 504}
+
+# Latencies kept per endpoint for percentile stats
+LATENCY_WINDOW = 10000
+
+
+class MLClientError(Exception):
+    """Base class for failures raised by MLClient"""
+
+
+class MLHTTPError(MLClientError):
+    def __init__(self, status: int, detail: str):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.detail = detail
+
+
+class CircuitOpenError(MLClientError):
+    def __init__(self, retry_in: float):
+        super().__init__(f"Circuit open, ML API calls suspended for {retry_in:.1f}s")
+        self.retry_in = retry_in
+
+
+# -----------------------------
+# CIRCUIT BREAKER
+# -----------------------------
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failed calls and rejects calls until
+    `reset_seconds` have passed. Then one probe call is let through: success
+    closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = max(1, threshold)
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.probing or time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        if self.opened_at is None:
+            return
+
+        retry_in = self.reset_seconds - (time.monotonic() - self.opened_at)
+        if retry_in > 0 or self.probing:
+            raise CircuitOpenError(max(retry_in, 0.0))
+        self.probing = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.probing or self.failures >= self.threshold:
+            if self.opened_at is None or self.probing:
+                print(f"[ML CLIENT] Circuit opened after {self.failures} consecutive failures")
+            self.opened_at = time.monotonic()
+            self.probing = False
+
+
+# -----------------------------
+# LATENCY STATS
+# -----------------------------
+class EndpointStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def summary(self) -> Dict[str, Any]:
+        summary = {"calls": self.calls, "errors": self.errors, "retries": self.retries}
+        if self.latencies:
+            latencies_ms = np.asarray(self.latencies) * 1000
+            p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+            summary.update({
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "p99_ms": round(float(p99), 2),
+                "mean_ms": round(float(latencies_ms.mean()), 2),
+            })
+        return summary
+
+
+# -----------------------------
+# CLIENT
+# -----------------------------
+class MLClient:
+    """
+    Long-lived HTTP client for the ML API.
+
+    One aiohttp session (keep-alive connection pool) is shared by every call
+    made on the current event loop. Transient failures are retried with
+    exponential backoff and full jitter; repeated failures open the circuit
+    breaker so a down ML service fails fast instead of timing out per flight.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = ML_MAX_CONNECTIONS,
+        connect_timeout: float = ML_CONNECT_TIMEOUT_SECONDS,
+        request_timeout: float = ML_REQUEST_TIMEOUT_SECONDS,
+        retries: int = ML_RETRIES,
+        backoff_base: float = ML_BACKOFF_BASE_SECONDS,
+        backoff_max: float = ML_BACKOFF_MAX_SECONDS,
+        breaker_threshold: int = ML_BREAKER_THRESHOLD,
+        breaker_reset_seconds: float = ML_BREAKER_RESET_SECONDS,
+    ):
+        self.max_connections = max_connections
+        self.timeout = aiohttp.ClientTimeout(total=request_timeout, connect=connect_timeout)
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset_seconds)
+        self.endpoints: Dict[str, EndpointStats] = {}
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Sessions are bound to the loop they were created on
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections,
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._loop = loop
+        return self._session
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: uniform in [0, min(max, base * 2^attempt)]"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def post(
+        self,
+        url: str,
+        json: Any = None,
+        data: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> bytes:
+        """
+        POST to the ML API and return the response body
+
+        Raises:
+            CircuitOpenError: The circuit is open; no request was sent
+            MLHTTPError: Non-2xx response (after retries for retryable statuses)
+            asyncio.TimeoutError, aiohttp.ClientError: Transport failure after retries
+        """
+        stats = self.endpoints.setdefault(urlsplit(url).path, EndpointStats())
+        stats.calls += 1
+
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            stats.errors += 1
+            raise
+
+        start = time.perf_counter()
+        try:
+            body = await self._post_with_retries(url, json, data, headers, stats)
+        except MLHTTPError as e:
+            stats.errors += 1
+            if e.status >= 500 or e.status == 429:
+                self.breaker.record_failure()
+            else:
+                # The service answered; the request itself was bad
+                self.breaker.record_success()
+            raise
+        except (asyncio.TimeoutError, aiohttp.ClientError):
+            stats.errors += 1
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled or unexpected: don't leave a half-open probe stuck
+            self.breaker.probing = False
+            raise
+        finally:
+            stats.latencies.append(time.perf_counter() - start)
+
+        self.breaker.record_success()
+        return body
+
+    async def _post_with_retries(self, url, json, data, headers, stats: EndpointStats) -> bytes:
+        session = self._get_session()
+
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                async with session.post(url, json=json, data=data, headers=headers) as resp:
+                    body = await resp.read()
+                    if resp.status < 300:
+                        return body
+                    error = MLHTTPError(resp.status, body.decode(errors="replace"))
+                    if resp.status not in RETRY_STATUSES or last_attempt:
+                        raise error
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError):
+                if last_attempt:
+                    raise
+
+            stats.retries += 1
+            await asyncio.sleep(self.backoff(attempt))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.state,
+            "endpoints": {path: endpoint.summary() for path, endpoint in self.endpoints.items()},
+        }
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+ml_client = MLClient()
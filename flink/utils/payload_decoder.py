@@ -0,0 +1,148 @@
+from typing import Any, Dict, Iterable, Tuple
+
+import numpy as np
+import orjson
+import pandas as pd
+
+from utils.logger import get_logger
+
+logger = get_logger("PAYLOAD_DECODER")
+
+
+# Fields per topic, as declared in sql/sources.sql (plus
+# precipitation_probability, which the backend sends and the weather
+# transformer uses). Anything else in a record is ignored.
+FLIGHT_SCHEMA = {
+    "flightID": "string",
+    "airlineName": "string",
+    "airlineIcaoCode": "string",
+    "airlineIataCode": "string",
+    "scheduledDepartureTime": "string",
+    "actualDepartureTime": "string",
+    "scheduledArrivalTime": "string",
+    "actualArrivalTime": "string",
+    "originAirportIata": "string",
+    "destinationAirportIata": "string",
+    "delay": "float",
+    "status": "string",
+}
+
+WEATHER_SCHEMA = {
+    "location": "string",
+    "icao_code": "string",
+    "iata_code": "string",
+    "datetime": "string",
+    "visibility": "float",
+    "precipitation": "float",
+    "precipitation_probability": "float",
+    "wind_speed": "float",
+    "wind_direction": "float",
+    "temperature": "float",
+    "humidity": "float",
+    "pressure": "float",
+    "cloud_cover": "float",
+}
+
+
+def _to_float(value) -> float:
+    if value is None or isinstance(value, bool):
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def decode_payloads(values: Iterable[Any], schema: Dict[str, str]) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Decode raw topic messages straight into one typed column per schema field
+
+    Every message is parsed on its own, so a list payload, a single-object
+    payload or a broken message can sit next to each other in one window.
+
+    Args:
+        values: Raw message values (bytes or str), e.g. the `data` column from flink_read
+        schema: Field name -> "string" | "float"
+
+    Returns:
+        The decoded records as a DataFrame with exactly the schema columns
+        (float64 for numeric fields, object for strings), and counts of
+        messages, records and malformed messages/records
+    """
+    columns = {name: [] for name in schema}
+    stats = {"messages": 0, "records": 0, "malformed_messages": 0, "malformed_records": 0}
+
+    for value in values:
+        stats["messages"] += 1
+        if value is None:
+            stats["malformed_messages"] += 1
+            continue
+        try:
+            payload = orjson.loads(value)
+        except (orjson.JSONDecodeError, TypeError):
+            stats["malformed_messages"] += 1
+            continue
+
+        records = payload if isinstance(payload, list) else [payload]
+        valid = [record for record in records if isinstance(record, dict)]
+        stats["malformed_records"] += len(records) - len(valid)
+        stats["records"] += len(valid)
+
+        # One pass per field over this message's records
+        for name, column in columns.items():
+            column.extend([record.get(name) for record in valid])
+
+    data = {}
+    for name, kind in schema.items():
+        raw = columns[name]
+        if kind == "float":
+            try:
+                # numpy maps None to NaN itself
+                data[name] = np.array(raw, dtype=np.float64)
+            except (TypeError, ValueError):
+                data[name] = np.fromiter((_to_float(v) for v in raw), dtype=np.float64, count=len(raw))
+        else:
+            data[name] = np.array([v if v is None or isinstance(v, str) else str(v) for v in raw], dtype=object)
+        columns[name] = None  # release the list as soon as its array exists
+
+    if stats["malformed_messages"] or stats["malformed_records"]:
+        logger.warning(
+            f"Skipped {stats['malformed_messages']} malformed messages and "
+            f"{stats['malformed_records']} malformed records"
+        )
+
+    return pd.DataFrame(data, columns=list(schema)), stats
+
+
+def decode_table(table, schema: Dict[str, str], block_messages: int = 500) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Decode a flink_read table block by block while its rows are collected
+
+    Unlike table.to_pandas(), the raw messages are never all held at once:
+    only block_messages of them, plus the typed columns decoded so far.
+
+    Returns:
+        Same as decode_payloads, for the whole table
+    """
+    frames = []
+    totals = {"messages": 0, "records": 0, "malformed_messages": 0, "malformed_records": 0}
+
+    def flush(block):
+        frame, stats = decode_payloads(block, schema)
+        frames.append(frame)
+        for name, count in stats.items():
+            totals[name] += count
+
+    with table.execute().collect() as results:
+        block = []
+        for row in results:
+            block.append(row[0])
+            if len(block) >= block_messages:
+                flush(block)
+                block = []
+        if block:
+            flush(block)
+
+    if not frames:
+        return pd.DataFrame(columns=list(schema)), totals
+    return pd.concat(frames, ignore_index=True), totals
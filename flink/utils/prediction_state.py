@@ -0,0 +1,124 @@
+import json
+import time
+from typing import Any, Dict, Optional
+
+import pandas as pd
+from kafka import KafkaConsumer, TopicPartition
+
+from utils.kafka_utils import BOOTSTRAP
+from utils.logger import get_logger
+
+logger = get_logger("PREDICTION_STATE")
+
+
+def departure_from_key(unique_key: str) -> Optional[pd.Timestamp]:
+    """sched_dep_time encoded in unique_key (<airline>_<%Y-%m-%dT%H:%M:%SZ>_<origin>_<dest>)"""
+    parts = str(unique_key).rsplit("_", 3)
+    if len(parts) != 4:
+        return None
+    departure = pd.to_datetime(parts[1], errors="coerce", utc=True)
+    return None if pd.isna(departure) else departure
+
+
+class PredictionStateStore:
+    """
+    Latest prediction per flight, mirrored in a log-compacted topic.
+
+    The topic is the store: every run replays it (compaction keeps it to
+    one message per live flight) to learn what was last published, then
+    only writes flights whose stage/prediction changed, and tombstones
+    (null value) flights that have departed so compaction drops them.
+    """
+
+    def __init__(self, topic: str, load_timeout_s: float = 60.0):
+        self.topic = topic
+        self.load_timeout_s = load_timeout_s
+        self.state: Dict[str, Dict[str, Any]] = {}
+
+        self.emitted = 0
+        self.unchanged = 0
+        self.tombstoned = 0
+
+    # -----------------------------
+    # LOAD
+    # -----------------------------
+    def load(self):
+        """Replay the compacted topic from the beginning up to its current end"""
+        consumer = KafkaConsumer(
+            bootstrap_servers=BOOTSTRAP,
+            enable_auto_commit=False,
+            key_deserializer=lambda k: k.decode("utf-8") if k is not None else None,
+            value_deserializer=lambda v: json.loads(v.decode("utf-8")) if v is not None else None,
+        )
+        try:
+            partitions = [TopicPartition(self.topic, p) for p in consumer.partitions_for_topic(self.topic) or []]
+            if not partitions:
+                logger.info(f"State topic {self.topic} is empty or missing, starting fresh")
+                return
+
+            consumer.assign(partitions)
+            consumer.seek_to_beginning(*partitions)
+            end_offsets = consumer.end_offsets(partitions)
+
+            deadline = time.monotonic() + self.load_timeout_s
+            while any(consumer.position(tp) < end_offsets[tp] for tp in partitions):
+                if time.monotonic() > deadline:
+                    # Unknown flights are simply re-emitted; compaction dedups them
+                    logger.warning(f"State load timed out after {self.load_timeout_s:.0f}s with {len(self.state)} flights")
+                    break
+
+                for records in consumer.poll(timeout_ms=1000).values():
+                    for record in records:
+                        if record.value is None:
+                            self.state.pop(record.key, None)
+                        else:
+                            self.state[record.key] = record.value
+        finally:
+            consumer.close()
+
+        logger.info(f"Loaded latest predictions for {len(self.state)} flights from {self.topic}")
+
+    # -----------------------------
+    # PUBLISH
+    # -----------------------------
+    def changed(self, unique_key: str, message: Dict[str, Any]) -> bool:
+        previous = self.state.get(unique_key)
+        return (
+            previous is None
+            or previous.get("stage") != message.get("stage")
+            or previous.get("prediction") != message.get("prediction")
+        )
+
+    def publish(self, delivery, producer, unique_key: str, message: Dict[str, Any]) -> bool:
+        """Write the prediction if it differs from the last one published; returns whether it did"""
+        if not self.changed(unique_key, message):
+            self.unchanged += 1
+            return False
+
+        delivery.send(producer, self.topic, unique_key, message)
+        self.state[unique_key] = message
+        self.emitted += 1
+        return True
+
+    def tombstone_departed(self, delivery, producer, now: Optional[pd.Timestamp] = None) -> int:
+        """Send a null value for every known flight whose departure has passed"""
+        now = now if now is not None else pd.Timestamp.now(tz="UTC")
+
+        departed = [
+            unique_key for unique_key in self.state
+            if (departure := departure_from_key(unique_key)) is not None and departure < now
+        ]
+        for unique_key in departed:
+            delivery.send(producer, self.topic, unique_key, None)
+            del self.state[unique_key]
+
+        self.tombstoned += len(departed)
+        return len(departed)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "flights": len(self.state),
+            "emitted": self.emitted,
+            "unchanged": self.unchanged,
+            "tombstoned": self.tombstoned,
+        }
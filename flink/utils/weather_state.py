@@ -0,0 +1,135 @@
+import os
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from utils.logger import get_logger
+
+logger = get_logger("WEATHER_STATE")
+
+# Marks carried-over rows inside transform_weather_data_serving
+CONTEXT_COLUMN = "_from_state"
+
+# Hash of the raw incoming row, to tell re-sent hours from revised ones
+HASH_COLUMN = "_raw_hash"
+
+# shift(1) needs one earlier row and rolling(3) two; forward-fill only needs
+# the latest row, because stored rows are already forward-filled
+CONTEXT_ROWS = 2
+
+
+def raw_row_hashes(df: pd.DataFrame) -> pd.Series:
+    columns = sorted(c for c in df.columns if c not in (CONTEXT_COLUMN, HASH_COLUMN))
+    return pd.util.hash_pandas_object(df[columns], index=False)
+
+
+class WeatherFeatureState:
+    """
+    Weather rows per airport_iata from earlier batches, persisted to a file.
+
+    The backend re-sends each airport's weather from a day or more before
+    its last saved hour, so most rows of a batch were already transformed
+    last time. For every airport this keeps, over retain_hours:
+
+        filled    forward-filled inputs, the context lag/rolling/ffill continue from
+        features  finished feature rows, returned again for unchanged hours
+
+    split() hands back stored features for the leading hours whose raw values
+    are unchanged, and only the rest (from the first new or revised hour on)
+    is transformed, prepended with the CONTEXT_ROWS stored rows before it.
+    retain_hours must cover the backend's re-send window, or re-sent hours
+    are no longer recognised and get recomputed.
+    """
+
+    def __init__(self, path: Optional[str] = None, retain_hours: float = 72.0):
+        self.path = path
+        self.retain = pd.Timedelta(hours=retain_hours)
+        self.filled: Dict[str, pd.DataFrame] = {}
+        self.features: Dict[str, pd.DataFrame] = {}
+
+    # -----------------------------
+    # PERSISTENCE
+    # -----------------------------
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            logger.info("No weather feature state found, starting fresh")
+            return
+        try:
+            stored = pd.read_pickle(self.path)
+            self.filled, self.features = stored["filled"], stored["features"]
+        except Exception as e:
+            logger.warning(f"Could not read weather feature state {self.path}, starting fresh: {e}")
+            self.filled, self.features = {}, {}
+            return
+        logger.info(f"Loaded weather feature state for {len(self.features)} airports")
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Write then rename, so a crash never leaves a truncated state file
+        tmp_path = f"{self.path}.tmp"
+        pd.to_pickle({"filled": self.filled, "features": self.features}, tmp_path)
+        os.replace(tmp_path, self.path)
+
+    # -----------------------------
+    # SPLIT / UPDATE
+    # -----------------------------
+    def split(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """
+        Divide incoming rows (with HASH_COLUMN) by what has to be recomputed
+
+        Returns:
+            Stored feature rows for unchanged leading hours, the stored
+            context rows to prepend, and the incoming rows to transform
+        """
+        reused, context, compute = [], [], []
+
+        for airport, rows in df.groupby("airport_iata", sort=False):
+            features = self.features.get(airport)
+            if features is None:
+                compute.append(rows)
+                continue
+
+            stored_hashes = rows["datetime"].map(features.set_index("datetime")[HASH_COLUMN])
+            unchanged = stored_hashes.eq(rows[HASH_COLUMN])
+            first_dirty = rows.loc[~unchanged, "datetime"].min() if not unchanged.all() else None
+
+            if first_dirty is None:
+                reused_hours = rows["datetime"]
+            else:
+                reused_hours = rows.loc[unchanged & (rows["datetime"] < first_dirty), "datetime"]
+                compute.append(rows[rows["datetime"] >= first_dirty])
+                filled = self.filled[airport]
+                context.append(filled[filled["datetime"] < first_dirty].tail(CONTEXT_ROWS))
+            reused.append(features[features["datetime"].isin(reused_hours)])
+
+        def frame(parts, like):
+            parts = [part for part in parts if not part.empty]
+            return pd.concat(parts, ignore_index=True) if parts else like.iloc[0:0]
+
+        return frame(reused, df), frame(context, df), frame(compute, df)
+
+    def update_filled(self, filled: pd.DataFrame):
+        """Store forward-filled new rows (CONTEXT_COLUMN rows are skipped)"""
+        new_rows = filled[~filled[CONTEXT_COLUMN].astype(bool)].drop(columns=[CONTEXT_COLUMN])
+        self._merge(self.filled, new_rows)
+
+    def update_features(self, features: pd.DataFrame):
+        self._merge(self.features, features)
+
+    def _merge(self, store: Dict[str, pd.DataFrame], new_rows: pd.DataFrame):
+        for airport, rows in new_rows.groupby("airport_iata"):
+            rows = rows.drop_duplicates("datetime", keep="last")
+            history = store.get(airport)
+            if history is not None:
+                # Revised hours replace what was stored for them
+                rows = pd.concat([history[~history["datetime"].isin(rows["datetime"])], rows])
+            rows = rows.sort_values("datetime", kind="stable")
+            store[airport] = rows[rows["datetime"] >= rows["datetime"].iloc[-1] - self.retain].reset_index(drop=True)
+
+    def stats(self):
+        return {
+            "airports": len(self.features),
+            "rows": sum(len(rows) for rows in self.features.values()),
+        }
@@ -0,0 +1,60 @@
+"""
+Binary matrix wire format shared by the Flink job and the ML API.
+
+Layout (little-endian):
+
+    header  magic b"FBW1" | version u8 | dtype u8 | n_blocks u16 | n_rows u32 | n_cols u32
+    body    n_blocks contiguous (n_rows x n_cols) arrays of the header dtype
+
+Requests carry float32 feature matrices with columns in training order
+(one block per stage). Responses carry int32 columns, one block each.
+"""
+import struct
+from typing import List
+import numpy as np
+
+
+MEDIA_TYPE = "application/x-flybeta-matrix"
+
+MAGIC = b"FBW1"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHII")
+
+DTYPES = {0: np.dtype("<f4"), 1: np.dtype("<i4")}
+DTYPE_CODES = {dtype: code for code, dtype in DTYPES.items()}
+
+
+def encode_blocks(blocks: List[np.ndarray], dtype: str = "<f4") -> bytes:
+    """Serialize same-shaped 2D arrays into one binary message"""
+    dtype = np.dtype(dtype)
+    n_rows, n_cols = blocks[0].shape if blocks else (0, 0)
+
+    header = HEADER.pack(MAGIC, VERSION, DTYPE_CODES[dtype], len(blocks), n_rows, n_cols)
+    body = b"".join(np.ascontiguousarray(block, dtype=dtype).tobytes() for block in blocks)
+
+    return header + body
+
+
+def decode_blocks(message: bytes) -> List[np.ndarray]:
+    """
+    Wrap a binary message as NumPy arrays without copying
+
+    Raises:
+        ValueError: If the header is malformed or the body size does not match it
+    """
+    if len(message) < HEADER.size:
+        raise ValueError("Message is shorter than the header")
+
+    magic, version, dtype_code, n_blocks, n_rows, n_cols = HEADER.unpack_from(message)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Unsupported message format {magic!r} v{version}")
+    if dtype_code not in DTYPES:
+        raise ValueError(f"Unknown dtype code {dtype_code}")
+
+    dtype = DTYPES[dtype_code]
+    expected = HEADER.size + n_blocks * n_rows * n_cols * dtype.itemsize
+    if len(message) != expected:
+        raise ValueError(f"Expected {expected} bytes, got {len(message)}")
+
+    data = np.frombuffer(message, dtype=dtype, offset=HEADER.size)
+    return list(data.reshape(n_blocks, n_rows, n_cols))
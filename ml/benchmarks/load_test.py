@@ -0,0 +1,250 @@
+"""
+Load test for the ML API: throughput, tail latency and error rate per endpoint.
+
+Starts the service locally (or targets --url), replays feature vectors in
+feature_order against /predict/stage1 and /predict/stage2 and prints one
+JSON report, so runs can be diffed across releases.
+
+Run from the ml/ directory (needs httpx):
+
+    python -m benchmarks.load_test --concurrency 32 --duration 30
+    python -m benchmarks.load_test --rate 500 --duration 30 --input flights.jsonl
+    python -m benchmarks.load_test --batch-size 100 --output results.json
+
+--concurrency alone is a closed loop (each worker waits for its response
+before sending again). --rate is an open loop: requests are due at fixed
+intervals and latency is measured from the due time, so a saturated server
+shows up as queueing instead of silently lowering the offered load.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+import httpx
+import numpy as np
+import pandas as pd
+from src.schemas.feature_schema import FEATURE_ORDER, INTEGER_FEATURES
+from src.services.model_registry import synthetic_batch
+
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# -----------------------------
+# Input vectors
+# -----------------------------
+def load_rows(path: str) -> List[Dict[str, Any]]:
+    """Recorded vectors from a .jsonl (one object per line) or .csv file with feature_order columns"""
+    if path.endswith(".csv"):
+        df = pd.read_csv(path)
+    else:
+        df = pd.read_json(path, lines=True)
+
+    missing = [name for name in FEATURE_ORDER if name not in df.columns]
+    if missing:
+        raise SystemExit(f"{path} is missing features: {', '.join(missing[:5])}")
+
+    return to_payloads(df[FEATURE_ORDER].fillna(0).to_numpy(dtype=np.float64))
+
+
+def to_payloads(X: np.ndarray) -> List[Dict[str, Any]]:
+    integer = set(INTEGER_FEATURES)
+    return [
+        {name: int(v) if name in integer else float(v) for name, v in zip(FEATURE_ORDER, row)}
+        for row in X.tolist()
+    ]
+
+
+# -----------------------------
+# Local server
+# -----------------------------
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, timeout: float = 60.0) -> subprocess.Popen:
+    """Run the app under uvicorn (no reload) and wait until it answers"""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ML_DIR,
+    )
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/predict/", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+
+    process.terminate()
+    raise SystemExit(f"Server did not come up within {timeout:.0f}s")
+
+
+# -----------------------------
+# Load generation
+# -----------------------------
+class Recorder:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Dict[str, int] = {}
+        self.errors = 0
+
+    def record(self, seconds: float, status: str, ok: bool):
+        self.latencies.append(seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if not ok:
+            self.errors += 1
+
+
+async def send(client: httpx.AsyncClient, url: str, payload: Dict[str, Any], recorder: Recorder, started: float):
+    try:
+        response = await client.post(url, json=payload)
+        status, ok = str(response.status_code), response.is_success
+    except httpx.HTTPError as e:
+        status, ok = type(e).__name__, False
+    recorder.record(time.perf_counter() - started, status, ok)
+
+
+async def closed_loop(client, url, payloads, recorder, concurrency: int, duration: float):
+    deadline = time.perf_counter() + duration
+
+    async def worker(offset: int):
+        i = offset
+        while time.perf_counter() < deadline:
+            await send(client, url, payloads[i % len(payloads)], recorder, time.perf_counter())
+            i += concurrency
+
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+
+
+async def open_loop(client, url, payloads, recorder, rate: float, concurrency: int, duration: float):
+    slots = asyncio.Semaphore(concurrency)
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    tasks = []
+
+    async def fire(payload, due: float):
+        async with slots:
+            await send(client, url, payload, recorder, due)
+
+    for i in range(int(duration * rate)):
+        due = start + i * interval
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(fire(payloads[i % len(payloads)], due)))
+
+    await asyncio.gather(*tasks)
+
+
+def summarize(recorder: Recorder, elapsed: float, batch_size: int) -> Dict[str, Any]:
+    n = len(recorder.latencies)
+    latencies = np.asarray(recorder.latencies) * 1000 if n else np.zeros(1)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    succeeded = n - recorder.errors
+
+    return {
+        "requests": n,
+        "errors": recorder.errors,
+        "error_rate": round(recorder.errors / n, 4) if n else 0.0,
+        "statuses": recorder.statuses,
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_second": round(n / elapsed, 2) if elapsed else 0.0,
+        "flights_per_second": round(succeeded * batch_size / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3),
+            "mean": round(float(latencies.mean()), 3),
+            "max": round(float(latencies.max()), 3),
+        },
+    }
+
+
+async def run_stage(base_url: str, stage: int, rows: List[Dict[str, Any]], args) -> Dict[str, Any]:
+    if args.batch_size > 1:
+        url = f"{base_url}/predict/stage{stage}/batch"
+        payloads = [
+            {"instances": [rows[(i + j) % len(rows)] for j in range(args.batch_size)]}
+            for i in range(0, len(rows), args.batch_size)
+        ]
+    else:
+        url = f"{base_url}/predict/stage{stage}"
+        payloads = rows
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+        if args.warmup > 0:
+            await closed_loop(client, url, payloads, Recorder(), args.concurrency, args.warmup)
+
+        recorder = Recorder()
+        start = time.perf_counter()
+        if args.rate:
+            await open_loop(client, url, payloads, recorder, args.rate, args.concurrency, args.duration)
+        else:
+            await closed_loop(client, url, payloads, recorder, args.concurrency, args.duration)
+        elapsed = time.perf_counter() - start
+
+    return {"endpoint": url[len(base_url):], **summarize(recorder, elapsed, args.batch_size)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="Target a running service instead of starting one locally")
+    parser.add_argument("--stages", default="1,2", help="Comma-separated stages to load, run one after the other")
+    parser.add_argument("--input", default=None, help="Recorded vectors (.jsonl or .csv); synthetic when omitted")
+    parser.add_argument("--unique", type=int, default=10000, help="Distinct synthetic vectors (repeats hit the prediction cache)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Workers (closed loop) or max in-flight requests (open loop)")
+    parser.add_argument("--rate", type=float, default=None, help="Requests per second for an open loop")
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds per stage")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds per stage before measuring")
+    parser.add_argument("--batch-size", type=int, default=1, help="Rows per request; >1 uses the /batch endpoints")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--output", default=None, help="Write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+
+    rows = load_rows(args.input) if args.input else to_payloads(synthetic_batch(args.unique))
+
+    process = None
+    base_url = args.url
+    if base_url is None:
+        port = free_port()
+        process = start_server(port)
+        base_url = f"http://127.0.0.1:{port}"
+
+    try:
+        results = [asyncio.run(run_stage(base_url.rstrip("/"), int(stage), rows, args)) for stage in args.stages.split(",")]
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    report = {
+        "target": base_url,
+        "mode": f"open loop @ {args.rate:g} req/s" if args.rate else "closed loop",
+        "concurrency": args.concurrency,
+        "batch_size": args.batch_size,
+        "input": args.input or f"synthetic ({len(rows)} unique rows)",
+        "results": results,
+    }
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
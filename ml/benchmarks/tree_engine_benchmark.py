@@ -0,0 +1,74 @@
+"""
+Parity check and latency benchmark: native tree engine vs the library predict.
+
+Run from the ml/ directory:
+
+    python -m benchmarks.tree_engine_benchmark --version default --rows 1,10,100,1000
+"""
+import argparse
+import json
+import os
+import time
+import joblib  # type: ignore
+import numpy as np
+from src.schemas.feature_schema import N_FEATURES
+from src.services.model_registry import MODEL_FILES, registry, synthetic_batch
+from src.services.tree_engine import TreeEnsembleEngine, check_parity, threshold_batch
+
+
+def time_call(fn, X, repeats: int) -> float:
+    """Median wall time of fn(X) in milliseconds"""
+    fn(X)
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+
+def engine_nbytes(engine: TreeEnsembleEngine) -> int:
+    arrays = [engine.feature, engine.threshold, engine.left, engine.right,
+              engine.default_left, engine.value, engine.roots, engine.class_matrix]
+    return sum(array.nbytes for array in arrays)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--version", default=None, help="Model version (defaults to the one the service would serve)")
+    parser.add_argument("--rows", default="1,10,100,1000", help="Comma-separated batch sizes to time")
+    parser.add_argument("--parity-rows", type=int, default=10000)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    version = args.version or registry.requested_version()
+    path = registry.version_path(version)
+
+    report = {"version": version, "stages": {}}
+    for stage, filename in MODEL_FILES.items():
+        model = joblib.load(os.path.join(path, filename))
+        engine = TreeEnsembleEngine.from_model(model)
+
+        stage_report = {
+            "trees": int(len(engine.roots)),
+            "nodes": int(len(engine.feature)),
+            "max_depth": engine.max_depth,
+            "engine_bytes": engine_nbytes(engine),
+            "parity": check_parity(model, engine, threshold_batch(engine, N_FEATURES, args.parity_rows)) or "ok",
+            "latency_ms": {},
+        }
+
+        for n_rows in [int(n) for n in args.rows.split(",")]:
+            X = synthetic_batch(n_rows)
+            stage_report["latency_ms"][n_rows] = {
+                "library": round(time_call(model.predict, X, args.repeats), 4),
+                "native": round(time_call(engine.predict, X, args.repeats), 4),
+            }
+
+        report["stages"][stage] = stage_report
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
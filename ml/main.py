@@ -1,18 +1,48 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+import signal
+import threading
+import time
 import uvicorn
 import os
 from dotenv import load_dotenv
 from src.router import router
+from src.services.metrics import IN_FLIGHT, REQUEST_LATENCY, REQUESTS, TimedJSONResponse, route_template
+from src.services.model_registry import registry
 
 
 load_dotenv()
 PORT = int(os.getenv("ML_PORT", 7500))
 
 
-app = FastAPI()
+def reload_models(signum, frame):
+    """SIGHUP → load the requested model version off the signal handler and swap it in"""
+    threading.Thread(target=registry.reload, daemon=True).start()
+
+
+signal.signal(signal.SIGHUP, reload_models)
+
+
+app = FastAPI(default_response_class=TimedJSONResponse)
 app.include_router(router)
 
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        IN_FLIGHT.dec()
+        route = route_template(request.scope)
+        REQUESTS.labels(route, request.method, str(status)).inc()
+        REQUEST_LATENCY.labels(route).observe(time.perf_counter() - start)
+
+
 if __name__ == "__main__":
     print(f"Server is running on port {PORT}")
     uvicorn.run("main:app", host="0.0.0.0", port=PORT, reload=True)
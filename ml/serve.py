@@ -0,0 +1,186 @@
+"""
+Production entry point: pre-fork workers sharing one copy of the models.
+
+The parent imports the app (which loads and warms the active model version),
+binds the listening socket and forks ML_WORKERS uvicorn workers. Model
+memory is inherited copy-on-write, so it is not multiplied by the worker
+count. The parent only supervises:
+
+    SIGTERM / SIGINT  drain: workers stop accepting, finish in-flight
+                      requests (up to ML_GRACEFUL_TIMEOUT_SECONDS), exit
+    SIGHUP            rolling reload: the parent loads the requested model
+                      version, forks a fresh set of workers, then drains the old ones
+    worker crash      the worker is replaced
+
+Admin model endpoints only affect the worker that served them; use SIGHUP
+(with ML_MODEL_VERSION or the ACTIVE file) to switch versions in this mode.
+
+    python serve.py
+"""
+import gc
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+import traceback
+
+# Must be set before prometheus_client is imported so workers write
+# per-process metric files that /metrics aggregates
+if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="flybeta-ml-metrics-")
+else:
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+
+import uvicorn
+from prometheus_client import multiprocess
+from main import PORT, app
+from src.services.model_registry import registry
+from src.settings import GRACEFUL_TIMEOUT_SECONDS, WORKERS
+
+
+# -----------------------------
+# Worker
+# -----------------------------
+def run_worker(sock: socket.socket):
+    """Child process: serve on the inherited socket until told to stop"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)  # reloads are driven by the parent
+
+    config = uvicorn.Config(app, timeout_graceful_shutdown=GRACEFUL_TIMEOUT_SECONDS, log_level="info")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def spawn(sock: socket.socket) -> int:
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(sock)
+            os._exit(0)
+        except BaseException:
+            traceback.print_exc()
+            os._exit(1)
+    return pid
+
+
+# -----------------------------
+# Supervisor
+# -----------------------------
+class Supervisor:
+    def __init__(self, sock: socket.socket, n_workers: int):
+        self.sock = sock
+        self.n_workers = max(1, n_workers)
+        self.workers: set = set()
+        self.draining: dict = {}  # pid -> deadline for SIGKILL
+        self.stopping = False
+        self.reload_requested = False
+
+    def on_stop(self, signum, frame):
+        self.stopping = True
+
+    def on_reload(self, signum, frame):
+        self.reload_requested = True
+
+    def fork_workers(self):
+        # Objects alive now are shared; keep the collector from touching
+        # (and so copying) their pages in every worker
+        gc.collect()
+        gc.freeze()
+        while len(self.workers) < self.n_workers:
+            self.workers.add(spawn(self.sock))
+
+    def drain(self, pids):
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT_SECONDS + 5
+        for pid in pids:
+            self.workers.discard(pid)
+            self.draining[pid] = deadline
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def rolling_reload(self):
+        self.reload_requested = False
+        try:
+            previous = registry.active().version
+            bundle = registry.reload()
+            if bundle.version != previous:
+                registry.unload(previous)
+        except Exception as e:
+            print(f"[SERVE] Reload failed, keeping the current workers: {e}")
+            return
+
+        old = set(self.workers)
+        self.workers.clear()
+        self.fork_workers()
+        self.drain(old)
+        print(f"[SERVE] Rolled {len(old)} workers onto version '{bundle.version}'")
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+
+            multiprocess.mark_process_dead(pid)
+            self.draining.pop(pid, None)
+            if pid in self.workers:
+                self.workers.discard(pid)
+                print(f"[SERVE] Worker {pid} exited unexpectedly (status {status})")
+
+    def kill_overdue(self):
+        now = time.monotonic()
+        for pid, deadline in list(self.draining.items()):
+            if now > deadline:
+                print(f"[SERVE] Worker {pid} did not drain in time, killing it")
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                self.draining[pid] = float("inf")
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.on_stop)
+        signal.signal(signal.SIGINT, self.on_stop)
+        signal.signal(signal.SIGHUP, self.on_reload)
+
+        self.fork_workers()
+        print(f"[SERVE] {self.n_workers} workers serving on port {PORT} (parent {os.getpid()})")
+
+        while not self.stopping:
+            self.reap()
+            if self.reload_requested:
+                self.rolling_reload()
+            elif len(self.workers) < self.n_workers:
+                time.sleep(1)  # don't spin if workers crash on startup
+                self.fork_workers()
+            self.kill_overdue()
+            time.sleep(0.2)
+
+        print("[SERVE] Draining workers")
+        self.drain(set(self.workers))
+        while self.draining:
+            self.reap()
+            self.kill_overdue()
+            time.sleep(0.2)
+        print("[SERVE] Shut down")
+
+
+def main():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("0.0.0.0", PORT))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    Supervisor(sock, WORKERS).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
 from fastapi import APIRouter
 
 from src.routers.prediction_model import router as prediction_router
+from src.routers.admin import router as admin_router
+from src.routers.metrics import router as metrics_router
 
 router = APIRouter()
 router.include_router(prediction_router, prefix="/predict")
+router.include_router(admin_router, prefix="/admin")
+router.include_router(metrics_router)
@@ -0,0 +1,78 @@
+import hmac
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from src.services.model_registry import registry
+from src.services.prediction_cache import cache
+from src.settings import ADMIN_TOKEN
+
+
+def require_admin_token(x_admin_token: str = Header(default=None)):
+    # Deny by default: the service port is published, so no token means no admin API
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API is disabled (ML_ADMIN_TOKEN is not set)")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+router = APIRouter(dependencies=[Depends(require_admin_token)])
+
+
+@router.get("/models")
+async def list_models():
+    return registry.describe()
+
+
+@router.post("/models/reload")
+async def reload_models():
+    """Activate the version requested on disk (env pin, ACTIVE file or highest version)"""
+    try:
+        await run_in_threadpool(registry.reload)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return registry.describe()
+
+
+@router.post("/models/{version}/load")
+async def load_model(version: str):
+    """Load and warm up a version without sending traffic to it"""
+    try:
+        await run_in_threadpool(registry.load, version)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return registry.describe()
+
+
+@router.post("/models/{version}/activate")
+async def activate_model(version: str):
+    """Load, warm up and atomically switch traffic to a version"""
+    try:
+        await run_in_threadpool(registry.activate, version)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return registry.describe()
+
+
+@router.delete("/models/{version}")
+async def unload_model(version: str):
+    try:
+        registry.unload(version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Model version '{version}' is not loaded")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return registry.describe()
+
+
+@router.get("/cache")
+async def cache_stats():
+    return cache.stats()
+
+
+@router.delete("/cache")
+async def clear_cache():
+    cache.clear()
+    return cache.stats()
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+from src.services.metrics import render
+
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of request, phase, batch, cache and model metrics"""
+    return Response(content=render(), media_type=CONTENT_TYPE_LATEST)
@@ -1,16 +1,126 @@
-from fastapi import APIRouter
-import joblib  # type: ignore
+import json
+from typing import Any, Dict, List
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 import numpy as np
-from src.schemas.prediction import PredictionRequest
+import pandas as pd
+from src.schemas.prediction import (
+    PredictionRequest,
+    BatchPredictionRequest,
+    CascadeRequest,
+    RawBatchRequest,
+    feature_order,
+)
+from src.schemas.feature_schema import (
+    SCHEMA_HEADER,
+    check_schema_version,
+    coerce_rows,
+    validate_matrix,
+)
+from src.schemas.wire import MEDIA_TYPE, decode_blocks, encode_blocks
+from src.services.metrics import phase_timer
+from src.services.inference import predict_row, predict_rows, run_cascade
+from src.services.model_registry import registry
+from src.services.preprocessing import stage1_features, stage2_features
+from src.settings import MAX_BATCH_SIZE
 
 
-stage_1_model = joblib.load("src/models/stage_1.joblib")
-stage_2_model = joblib.load("src/models/stage_2.joblib")
+# Load and warm up the serving models before the first request
+registry.reload()
 
 
 router = APIRouter()
 
 
+def check_batch_size(n_rows: int):
+    if n_rows > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {n_rows} rows exceeds the limit of {MAX_BATCH_SIZE}",
+        )
+
+
+def to_matrix(instances: List[PredictionRequest]) -> np.ndarray:
+    """Stack validated feature rows into a single 2D array in training order"""
+    check_batch_size(len(instances))
+
+    with phase_timer("validation"):
+        return np.array(
+            [[features[name] for name in feature_order] for features in (row.model_dump() for row in instances)],
+            dtype=float,
+        )
+
+
+def check_schema(version):
+    try:
+        check_schema_version(version)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+async def read_binary_blocks(request: Request, n_blocks: int) -> List[np.ndarray]:
+    """Decode a binary request body into validated float32 feature matrices"""
+    check_schema(request.headers.get(SCHEMA_HEADER))
+    body = await request.body()
+
+    try:
+        with phase_timer("validation"):
+            blocks = decode_blocks(body)
+            if len(blocks) != n_blocks:
+                raise ValueError(f"Expected {n_blocks} matrices, got {len(blocks)}")
+            check_batch_size(blocks[0].shape[0])
+            return [validate_matrix(block) for block in blocks]
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+async def read_matrix_blocks(request: Request, keys: List[str]) -> List[np.ndarray]:
+    """
+    Decode a compact JSON matrix request without per-field model validation
+
+    Body: {"schema_version": ..., <key>: [[f1, ..., fN], ...], ...}
+    """
+    raw = await request.body()
+
+    with phase_timer("validation"):
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body is not valid JSON")
+        if not isinstance(body, dict):
+            raise HTTPException(status_code=422, detail="Body must be a JSON object")
+
+        check_schema(body.get("schema_version"))
+
+        try:
+            blocks = [coerce_rows(body.get(key)) for key in keys]
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+    if len({len(block) for block in blocks}) > 1:
+        raise HTTPException(status_code=422, detail=f"{keys} must have the same number of rows")
+    check_batch_size(len(blocks[0]))
+
+    return blocks
+
+
+async def score_raw_records(records: List[Dict[str, Any]]) -> List[dict]:
+    """Preprocess raw merged records as one DataFrame and run the cascade"""
+    records_df = pd.DataFrame(records)
+    X1 = await run_in_threadpool(stage1_features, records_df)
+
+    return await run_cascade(X1, lambda rows: stage2_features(records_df.iloc[rows]))
+
+
+def binary_response(*columns) -> Response:
+    """Encode prediction columns as an int32 binary response"""
+    with phase_timer("serialization"):
+        blocks = [np.asarray(column, dtype=np.int32).reshape(-1, 1) for column in columns]
+        content = encode_blocks(blocks, dtype="<i4")
+
+    return Response(content=content, media_type=MEDIA_TYPE)
+
+
 @router.get("/")
 async def home():
     return "Welcome to FlyBeta ML API"
@@ -21,11 +131,11 @@ async def predict(payload: PredictionRequest):
     # Convert Pydantic model → dict
     features = payload.model_dump()
 
-    # Convert dict → list/array in same order as training
-    X = [list(features.values())]
+    # Convert dict → array in same order as training
+    x = np.array([features[name] for name in feature_order], dtype=float)
 
-    # Make prediction
-    prediction = stage_1_model.predict(X).item()
+    # Served from the cache, or coalesced with concurrent requests into one batched predict
+    prediction = await predict_row(1, x)
 
     return {"prediction": prediction}
 
@@ -35,9 +145,122 @@ async def predict_stage_2(payload: PredictionRequest):
 
     features = payload.model_dump()
 
-    X = [list(features.values())]
+    x = np.array([features[name] for name in feature_order], dtype=float)
 
-
-    prediction_2 = stage_2_model.predict(X).item()
+    prediction_2 = await predict_row(2, x)
 
     return {"prediction_2": prediction_2}
+
+
+@router.post("/stage1/batch")
+async def predict_batch(payload: BatchPredictionRequest):
+    if not payload.instances:
+        return {"predictions": []}
+
+    # One vectorized call for the whole batch
+    X = to_matrix(payload.instances)
+    predictions = await predict_rows(1, X)
+
+    return {"predictions": predictions}
+
+
+@router.post("/stage2/batch")
+async def predict_stage_2_batch(payload: BatchPredictionRequest):
+    if not payload.instances:
+        return {"predictions": []}
+
+    X = to_matrix(payload.instances)
+    predictions = await predict_rows(2, X)
+
+    return {"predictions": predictions}
+
+
+@router.post("/cascade")
+async def predict_cascade(payload: CascadeRequest):
+    if not payload.instances:
+        return {"results": []}
+
+    X1 = to_matrix([instance.stage1 for instance in payload.instances])
+    X2 = to_matrix([instance.stage2 for instance in payload.instances])
+
+    results = await run_cascade(X1, lambda rows: X2[rows])
+
+    return {"results": results}
+
+
+@router.post("/raw")
+async def predict_raw(payload: Dict[str, Any]):
+    """Preprocess and score a single raw merged flight + weather record"""
+    results = await score_raw_records([payload])
+
+    return results[0]
+
+
+@router.post("/raw/batch")
+async def predict_raw_batch(payload: RawBatchRequest):
+    """Preprocess and score a batch of raw merged records in one DataFrame"""
+    if not payload.records:
+        return {"results": []}
+
+    check_batch_size(len(payload.records))
+
+    results = await score_raw_records(payload.records)
+
+    return {"results": results}
+
+
+# -----------------------------
+# COMPACT JSON MATRIX ENDPOINTS
+# -----------------------------
+@router.post("/stage1/matrix")
+async def predict_matrix(request: Request):
+    [X] = await read_matrix_blocks(request, ["rows"])
+    predictions = await predict_rows(1, X) if len(X) else []
+
+    return {"predictions": predictions}
+
+
+@router.post("/stage2/matrix")
+async def predict_stage_2_matrix(request: Request):
+    [X] = await read_matrix_blocks(request, ["rows"])
+    predictions = await predict_rows(2, X) if len(X) else []
+
+    return {"predictions": predictions}
+
+
+@router.post("/cascade/matrix")
+async def predict_cascade_matrix(request: Request):
+    X1, X2 = await read_matrix_blocks(request, ["stage1", "stage2"])
+    results = await run_cascade(X1, lambda rows: X2[rows]) if len(X1) else []
+
+    return {"results": results}
+
+
+# -----------------------------
+# BINARY MATRIX ENDPOINTS
+# -----------------------------
+@router.post("/stage1/binary")
+async def predict_binary(request: Request):
+    [X] = await read_binary_blocks(request, n_blocks=1)
+    predictions = await predict_rows(1, X) if len(X) else []
+
+    return binary_response(predictions)
+
+
+@router.post("/stage2/binary")
+async def predict_stage_2_binary(request: Request):
+    [X] = await read_binary_blocks(request, n_blocks=1)
+    predictions = await predict_rows(2, X) if len(X) else []
+
+    return binary_response(predictions)
+
+
+@router.post("/cascade/binary")
+async def predict_cascade_binary(request: Request):
+    X1, X2 = await read_binary_blocks(request, n_blocks=2)
+    results = await run_cascade(X1, lambda rows: X2[rows]) if len(X1) else []
+
+    return binary_response(
+        [result["stage"] for result in results],
+        [result["prediction"] for result in results],
+    )
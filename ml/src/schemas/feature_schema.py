@@ -0,0 +1,137 @@
+"""
+Feature schema contract shared by the Flink job and the ML API.
+
+FEATURE_ORDER is the column order the stage models were trained on. Both
+services keep an identical copy of this module; SCHEMA_VERSION is derived
+from the column names and order, so any drift between the two copies is
+rejected at request time instead of silently scoring shuffled features.
+"""
+import hashlib
+from typing import Any
+import numpy as np
+
+
+FEATURE_ORDER = [
+    "airline_name",
+    "origin_visibility_km",
+    "origin_precip_mm",
+    "origin_precip_prob_pct",
+    "origin_wind_speed_kmph",
+    "origin_wind_dir_deg",
+    "origin_temp_c",
+    "origin_humidity_pct",
+    "origin_pressure_mb",
+    "origin_cloud_cover_pct",
+    "origin_wind_speed_prev1h",
+    "origin_wind_speed_3h_mean",
+    "origin_precip_3h_sum",
+    "origin_visibility_3h_mean",
+    "origin_low_visibility_flag",
+    "origin_high_wind_flag",
+    "origin_high_humidity_flag",
+    "origin_rain_intensity",
+    "origin_wind_u",
+    "origin_wind_v",
+    "dest_visibility_km",
+    "dest_precip_mm",
+    "dest_precip_prob_pct",
+    "dest_wind_speed_kmph",
+    "dest_wind_dir_deg",
+    "dest_temp_c",
+    "dest_humidity_pct",
+    "dest_pressure_mb",
+    "dest_cloud_cover_pct",
+    "dest_wind_speed_prev1h",
+    "dest_wind_speed_3h_mean",
+    "dest_precip_3h_sum",
+    "dest_visibility_3h_mean",
+    "dest_low_visibility_flag",
+    "dest_high_wind_flag",
+    "dest_high_humidity_flag",
+    "dest_rain_intensity",
+    "dest_wind_u",
+    "dest_wind_v",
+    "route_adj_delay_mean",
+    "airline_adj_delay_mean",
+    "route_airline_adj_delay_mean",
+    "sched_dep_month_enc",
+    "sched_dep_dow_enc",
+    "sched_dep_time_block_enc",
+    "temp_diff",
+    "visibility_diff",
+    "wind_speed_diff",
+    "precip_prob_diff",
+    "origin_weather_index",
+    "dest_weather_index",
+    "route_freq",
+    "is_busy_route",
+]
+
+# Features the models expect as whole numbers (flags and counts)
+INTEGER_FEATURES = [
+    "origin_low_visibility_flag",
+    "origin_high_wind_flag",
+    "origin_high_humidity_flag",
+    "dest_wind_dir_deg",
+    "dest_low_visibility_flag",
+    "dest_high_wind_flag",
+    "dest_high_humidity_flag",
+    "route_freq",
+    "is_busy_route",
+]
+
+SCHEMA_VERSION = hashlib.sha1(",".join(FEATURE_ORDER).encode("utf-8")).hexdigest()[:12]
+
+# HTTP header carrying SCHEMA_VERSION on matrix and binary requests
+SCHEMA_HEADER = "X-Feature-Schema"
+
+N_FEATURES = len(FEATURE_ORDER)
+INTEGER_COLUMNS = np.array([FEATURE_ORDER.index(name) for name in INTEGER_FEATURES])
+
+
+def check_schema_version(version: Any):
+    """Raise ValueError unless the client was built against this schema"""
+    if version != SCHEMA_VERSION:
+        raise ValueError(f"Feature schema mismatch: got {version!r}, expected {SCHEMA_VERSION!r}")
+
+
+def validate_matrix(X: np.ndarray) -> np.ndarray:
+    """
+    Check a feature matrix against the schema with one vectorized pass
+
+    Raises:
+        ValueError: On wrong shape, non-finite values or fractional values
+            in integer features
+    """
+    if X.ndim != 2 or X.shape[1] != N_FEATURES:
+        raise ValueError(f"Expected shape (n, {N_FEATURES}), got {X.shape}")
+
+    if not np.isfinite(X).all():
+        raise ValueError("Feature matrix contains NaN or Inf values")
+
+    integer_values = X[:, INTEGER_COLUMNS]
+    if not np.array_equal(integer_values, np.trunc(integer_values)):
+        raise ValueError(f"Integer features must be whole numbers: {INTEGER_FEATURES}")
+
+    return X
+
+
+def coerce_rows(rows: Any) -> np.ndarray:
+    """
+    Coerce row-major feature lists straight into a float32 matrix in
+    training order, then validate it
+
+    Raises:
+        ValueError: If the rows cannot be coerced or fail validation
+    """
+    if not isinstance(rows, list):
+        raise ValueError("Rows must be a list of feature lists")
+    if not rows:
+        return np.empty((0, N_FEATURES), dtype=np.float32)
+
+    try:
+        X = np.asarray(rows, dtype=np.float32)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Rows do not match the feature schema: {e}")
+
+    return validate_matrix(X)
@@ -1,4 +1,6 @@
+from typing import Any, Dict, List
 from pydantic import BaseModel
+from src.schemas.feature_schema import FEATURE_ORDER
 
 class PredictionRequest(BaseModel):
     airline_name: float
@@ -54,3 +56,28 @@ class PredictionRequest(BaseModel):
     dest_weather_index: float
     route_freq: int
     is_busy_route: int
+
+
+# Column order the stage models were trained on
+feature_order = FEATURE_ORDER
+
+# Fail at startup rather than score columns in the wrong order
+if list(PredictionRequest.model_fields) != feature_order:
+    raise RuntimeError("PredictionRequest fields do not match the feature schema order")
+
+
+class BatchPredictionRequest(BaseModel):
+    instances: List[PredictionRequest]
+
+
+class CascadeInstance(BaseModel):
+    stage1: PredictionRequest
+    stage2: PredictionRequest
+
+
+class CascadeRequest(BaseModel):
+    instances: List[CascadeInstance]
+
+
+class RawBatchRequest(BaseModel):
+    records: List[Dict[str, Any]]
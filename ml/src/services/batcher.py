@@ -0,0 +1,77 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Set, Tuple
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from src.services.model_registry import ModelBundle
+from src.settings import MICROBATCH_MAX_ROWS, MICROBATCH_MAX_WAIT_MS
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row requests for one stage into a batch.
+
+    Rows wait for up to max_wait_ms or until max_rows are queued, then the
+    whole batch is scored with one predict call in a worker thread and each
+    caller's future is resolved with its own prediction. The event loop is
+    never blocked on the model. Rows are scored with the model version they
+    were submitted for, so a hot-swap mid-batch cannot mix versions.
+    """
+
+    def __init__(self, stage: int, max_rows: int = MICROBATCH_MAX_ROWS, max_wait_ms: float = MICROBATCH_MAX_WAIT_MS):
+        self.stage = stage
+        self.max_rows = max(1, max_rows)
+        self.max_wait = max_wait_ms / 1000
+        self._pending: List[Tuple[np.ndarray, ModelBundle, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Running batches; the loop only keeps weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, row: np.ndarray, bundle: ModelBundle) -> Any:
+        """Queue one feature row for the given model version and wait for its prediction"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((row, bundle, future))
+
+        if len(self._pending) >= self.max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        # Normally one version; more only if a rollout landed while rows queued
+        by_version: Dict[str, List[Tuple[np.ndarray, ModelBundle, asyncio.Future]]] = {}
+        for entry in batch:
+            by_version.setdefault(entry[1].version, []).append(entry)
+
+        for entries in by_version.values():
+            task = asyncio.ensure_future(self._run(entries[0][1], entries))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, bundle: ModelBundle, batch: List[Tuple[np.ndarray, ModelBundle, asyncio.Future]]):
+        X = np.vstack([row for row, _, _ in batch])
+
+        try:
+            predictions = await run_in_threadpool(bundle.predict, self.stage, X)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future), prediction in zip(batch, predictions.tolist()):
+            if not future.done():
+                future.set_result(prediction)
+
+
+batchers = {1: MicroBatcher(stage=1), 2: MicroBatcher(stage=2)}
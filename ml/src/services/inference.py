@@ -0,0 +1,67 @@
+from typing import Any, Callable, List, Optional
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from src.services.batcher import batchers
+from src.services.model_registry import ModelBundle, registry
+from src.services.prediction_cache import cache
+
+
+def predict(stage: int, X, bundle: Optional[ModelBundle] = None) -> np.ndarray:
+    """Score a feature matrix with the given (or currently active) model version"""
+    bundle = bundle or registry.active()
+    return bundle.predict(stage, X)
+
+
+async def predict_rows(stage: int, X: np.ndarray, bundle: Optional[ModelBundle] = None) -> List[Any]:
+    """Score a batch through the prediction cache; misses run in one threadpool predict"""
+    bundle = bundle or registry.active()
+
+    async def compute(X_missed: np.ndarray):
+        return await run_in_threadpool(predict, stage, X_missed, bundle)
+
+    return await cache.predict_many(stage, bundle.version, X, compute)
+
+
+async def predict_row(stage: int, x: np.ndarray) -> Any:
+    """Score a single row through the prediction cache; misses join a micro-batch"""
+    bundle = registry.active()
+
+    async def compute(X_missed: np.ndarray):
+        return [await batchers[stage].submit(X_missed[0], bundle)]
+
+    [prediction] = await cache.predict_many(stage, bundle.version, x.reshape(1, -1), compute)
+    return prediction
+
+
+async def run_cascade(
+    X1: np.ndarray,
+    stage_2_features: Callable[[np.ndarray], np.ndarray],
+    bundle: Optional[ModelBundle] = None,
+) -> List[dict]:
+    """
+    Run stage 1 on every row and stage 2 only on the rows predicted as delayed
+
+    Args:
+        X1: Stage 1 feature matrix
+        stage_2_features: Builds the stage 2 matrix for the given row indices
+            (runs in the threadpool)
+        bundle: Model version to use for both stages (defaults to the active one)
+
+    Returns:
+        One {stage, prediction} dict per input row
+    """
+    # Pin one version so both stages come from the same rollout
+    bundle = bundle or registry.active()
+
+    stage_1_predictions = np.asarray(await predict_rows(1, X1, bundle))
+    results = [{"stage": 1, "prediction": p} for p in stage_1_predictions.tolist()]
+
+    # Only flights predicted as DELAYED go through stage 2
+    delayed = np.flatnonzero(stage_1_predictions != 0)
+    if delayed.size:
+        X2 = await run_in_threadpool(stage_2_features, delayed)
+        stage_2_predictions = await predict_rows(2, X2, bundle)
+        for idx, prediction in zip(delayed.tolist(), stage_2_predictions):
+            results[idx] = {"stage": 2, "prediction": prediction}
+
+    return results
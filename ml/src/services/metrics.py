@@ -0,0 +1,112 @@
+import os
+import time
+from contextlib import contextmanager
+from fastapi.responses import JSONResponse
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+PHASE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1000, 2000, 5000)
+
+
+REQUESTS = Counter(
+    "flybeta_ml_requests_total",
+    "HTTP requests by route, method and status code",
+    ["route", "method", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "flybeta_ml_request_duration_seconds",
+    "End-to-end request latency by route",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+IN_FLIGHT = Gauge(
+    "flybeta_ml_requests_in_flight",
+    "Requests currently being handled",
+    multiprocess_mode="livesum",
+)
+PHASE_LATENCY = Histogram(
+    "flybeta_ml_phase_duration_seconds",
+    "Time spent in validation, preprocessing, predict and serialization",
+    ["phase"],
+    buckets=PHASE_BUCKETS,
+)
+PREDICT_BATCH_ROWS = Histogram(
+    "flybeta_ml_predict_batch_rows",
+    "Rows scored per model predict call",
+    ["stage"],
+    buckets=BATCH_BUCKETS,
+)
+MODEL_INFO = Gauge(
+    "flybeta_ml_model_info",
+    "Serving model version and engine per stage (1 = active)",
+    ["version", "stage", "engine"],
+    multiprocess_mode="livemax",
+)
+CACHE_EVENTS = Counter(
+    "flybeta_ml_cache_events_total",
+    "Prediction cache hits, misses, coalesced lookups, evictions and expirations",
+    ["event"],
+)
+CACHE_ENTRIES = Gauge(
+    "flybeta_ml_cache_entries",
+    "Predictions currently held in the cache",
+    multiprocess_mode="livesum",
+)
+
+
+@contextmanager
+def phase_timer(phase: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASE_LATENCY.labels(phase).observe(time.perf_counter() - start)
+
+
+def observe_predict(stage: int, n_rows: int, seconds: float):
+    PREDICT_BATCH_ROWS.labels(str(stage)).observe(n_rows)
+    PHASE_LATENCY.labels("predict").observe(seconds)
+
+
+def set_active_model(previous, bundle):
+    """Flip the model info gauge from the previous bundle to the new one"""
+    if previous is not None:
+        for stage, engine in previous.engines.items():
+            MODEL_INFO.labels(previous.version, str(stage), engine).set(0)
+    for stage, engine in bundle.engines.items():
+        MODEL_INFO.labels(bundle.version, str(stage), engine).set(1)
+
+
+def route_template(scope: dict) -> str:
+    """
+    Full route template of a handled request ("/admin/models/{version}/load"),
+    so path parameters and unknown URLs don't explode label cardinality
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+
+    # FastAPI >= 0.140 matches included routers in place, so route.path lacks
+    # the include prefix; the prefixed template is on the effective route
+    # context. Older versions copy routes with the prefix into route.path.
+    effective = scope.get("fastapi", {}).get("effective_route_context")
+    return getattr(effective, "path", None) or route.path
+
+
+def render() -> bytes:
+    # Under serve.py every worker writes its own files; aggregate them all
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        collector_registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collector_registry)
+        return generate_latest(collector_registry)
+    return generate_latest()
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSON response that records its encoding time as the serialization phase"""
+
+    def render(self, content) -> bytes:
+        with phase_timer("serialization"):
+            return super().render(content)
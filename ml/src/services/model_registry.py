@@ -0,0 +1,227 @@
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import joblib  # type: ignore
+import numpy as np
+from src.schemas.feature_schema import INTEGER_COLUMNS, N_FEATURES
+from src.services.metrics import observe_predict, set_active_model
+from src.services.tree_engine import (
+    NativeModel, TreeEnsembleEngine, UnsupportedModelError, check_parity, threshold_batch,
+)
+from src.settings import INFERENCE_ENGINE, MODEL_DIR, MODEL_VERSION, NATIVE_ENGINE_MAX_ROWS, WARMUP_ROWS
+
+
+DEFAULT_VERSION = "default"
+ACTIVE_FILE = "ACTIVE"
+MODEL_FILES = {1: "stage_1.joblib", 2: "stage_2.joblib"}
+
+# Rows checked against the original model before a native engine is used
+PARITY_ROWS = 2000
+
+
+def version_sort_key(version: str) -> tuple:
+    """Natural order for version names, so v10 sorts after v9 and 2.10 after 2.9"""
+    return tuple(
+        (0, int(part), "") if part.isdigit() else (1, 0, part.lower())
+        for part in re.split(r"(\d+)", version)
+        if part
+    )
+
+
+@dataclass
+class ModelBundle:
+    """Stage 1 and stage 2 models that were trained and are served together"""
+    version: str
+    stage_1: Any
+    stage_2: Any
+    loaded_at: float = field(default_factory=time.time)
+    warmup_ms: float = 0.0
+    engines: Dict[int, str] = field(default_factory=lambda: {1: "xgboost", 2: "xgboost"})
+
+    def model(self, stage: int):
+        return self.stage_1 if stage == 1 else self.stage_2
+
+    def predict(self, stage: int, X) -> np.ndarray:
+        start = time.perf_counter()
+        predictions = self.model(stage).predict(X)
+        observe_predict(stage, len(X), time.perf_counter() - start)
+        return predictions
+
+
+def synthetic_batch(n_rows: int) -> np.ndarray:
+    """Deterministic feature matrix in schema shape, used to warm models up"""
+    X = np.random.default_rng(0).normal(size=(n_rows, N_FEATURES)).astype(np.float32)
+    X[:, INTEGER_COLUMNS] = np.abs(np.round(X[:, INTEGER_COLUMNS]))
+    return X
+
+
+class ModelRegistry:
+    """
+    Holds several model versions side by side and serves one as active.
+
+    Loading and warming a version happens off to the side; swapping the
+    active version is a single reference assignment, so in-flight requests
+    finish on the bundle they started with.
+    """
+
+    def __init__(self, model_dir: str = MODEL_DIR):
+        self.model_dir = model_dir
+        self._versions: Dict[str, ModelBundle] = {}
+        self._active: Optional[ModelBundle] = None
+        self._lock = threading.Lock()
+
+    # -----------------------------
+    # DISCOVERY
+    # -----------------------------
+    def version_path(self, version: str) -> str:
+        """
+        Directory of a version on disk
+
+        Raises:
+            FileNotFoundError: Unless the version is one of available_versions(),
+                so a name like ".." can never point outside model_dir
+        """
+        if version not in self.available_versions():
+            raise FileNotFoundError(f"Model version '{version}' not found in {self.model_dir}")
+        if version == DEFAULT_VERSION:
+            return self.model_dir
+        return os.path.join(self.model_dir, version)
+
+    def available_versions(self) -> List[str]:
+        """Versions on disk that contain both stage models"""
+        def has_models(path):
+            return all(os.path.isfile(os.path.join(path, name)) for name in MODEL_FILES.values())
+
+        if not os.path.isdir(self.model_dir):
+            return []
+
+        versions = sorted(
+            (
+                entry for entry in os.listdir(self.model_dir)
+                if has_models(os.path.join(self.model_dir, entry))
+            ),
+            key=version_sort_key,
+        )
+        if has_models(self.model_dir):
+            versions.insert(0, DEFAULT_VERSION)
+
+        return versions
+
+    def requested_version(self) -> str:
+        """Version to serve: env pin, then the ACTIVE file, then the highest version on disk"""
+        if MODEL_VERSION:
+            return MODEL_VERSION
+
+        active_file = os.path.join(self.model_dir, ACTIVE_FILE)
+        if os.path.isfile(active_file):
+            with open(active_file, "r") as f:
+                return f.read().strip()
+
+        available = self.available_versions()
+        if not available:
+            raise FileNotFoundError(f"No stage models found in {self.model_dir}")
+        return available[-1]
+
+    # -----------------------------
+    # LIFECYCLE
+    # -----------------------------
+    def load(self, version: str) -> ModelBundle:
+        """Load and warm up a version without activating it"""
+        if version in self._versions:
+            return self._versions[version]
+
+        path = self.version_path(version)
+        bundle = ModelBundle(
+            version=version,
+            stage_1=joblib.load(os.path.join(path, MODEL_FILES[1])),
+            stage_2=joblib.load(os.path.join(path, MODEL_FILES[2])),
+        )
+        if INFERENCE_ENGINE == "native":
+            self.compile(bundle)
+        self.warmup(bundle)
+
+        with self._lock:
+            return self._versions.setdefault(version, bundle)
+
+    def compile(self, bundle: ModelBundle):
+        """Swap in the native tree engine for each stage that compiles and matches the original"""
+        for stage in MODEL_FILES:
+            model = bundle.model(stage)
+            try:
+                engine = TreeEnsembleEngine.from_model(model)
+            except UnsupportedModelError as e:
+                print(f"[MODELS] Stage {stage} of '{bundle.version}' stays on the library engine: {e}")
+                continue
+
+            # Rows on this model's split boundaries (and NaNs for the default branches)
+            X = threshold_batch(engine, N_FEATURES, PARITY_ROWS)
+            mismatch = check_parity(model, engine, X)
+            if mismatch:
+                print(f"[MODELS] Stage {stage} of '{bundle.version}' failed the native parity check: {mismatch}")
+                continue
+
+            setattr(bundle, f"stage_{stage}", NativeModel(model, engine, NATIVE_ENGINE_MAX_ROWS))
+            bundle.engines[stage] = "native"
+
+    def warmup(self, bundle: ModelBundle):
+        """Score a synthetic batch and a single row on both stages before serving"""
+        start = time.perf_counter()
+
+        X = synthetic_batch(WARMUP_ROWS)
+        for stage in MODEL_FILES:
+            model = bundle.model(stage)
+            model.predict(X)
+            model.predict(X[:1])
+
+        bundle.warmup_ms = (time.perf_counter() - start) * 1000
+        print(f"[MODELS] Version '{bundle.version}' warmed up in {bundle.warmup_ms:.1f} ms")
+
+    def activate(self, version: str) -> ModelBundle:
+        """Load (if needed) and atomically switch traffic to a version"""
+        bundle = self.load(version)
+
+        with self._lock:
+            previous = self._active
+            self._active = bundle
+
+        if previous is not bundle:
+            set_active_model(previous, bundle)
+            print(f"[MODELS] Active version is now '{version}'")
+        return bundle
+
+    def unload(self, version: str):
+        """Drop an inactive version from memory"""
+        with self._lock:
+            if self._active is not None and self._active.version == version:
+                raise ValueError(f"Cannot unload the active version '{version}'")
+            if self._versions.pop(version, None) is None:
+                raise KeyError(version)
+
+    def reload(self) -> ModelBundle:
+        """Re-read the requested version from disk and activate it"""
+        return self.activate(self.requested_version())
+
+    def active(self) -> ModelBundle:
+        if self._active is None:
+            raise RuntimeError("No model version is active")
+        return self._active
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "active": self._active.version if self._active else None,
+            "loaded": {
+                version: {
+                    "loaded_at": bundle.loaded_at,
+                    "warmup_ms": round(bundle.warmup_ms, 2),
+                    "engines": bundle.engines,
+                }
+                for version, bundle in self._versions.items()
+            },
+            "available": self.available_versions(),
+        }
+
+
+registry = ModelRegistry()
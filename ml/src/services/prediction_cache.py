@@ -0,0 +1,191 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Sequence, Set, Tuple
+import numpy as np
+from src.services.metrics import CACHE_ENTRIES, CACHE_EVENTS
+from src.settings import PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL_SECONDS
+
+
+CacheKey = Tuple[int, str, bytes]
+
+
+class PredictionCache:
+    """
+    LRU + TTL cache of predictions keyed by stage, model version and a hash
+    of the feature vector, with single-flight for identical in-flight rows.
+
+    Only touched from the event loop, so no locking is needed. Computations
+    other requests may be waiting on run in their own task, so cancelling
+    the request that started one (e.g. a client disconnect) cannot cancel
+    the shared result.
+    """
+
+    def __init__(self, max_entries: int = PREDICTION_CACHE_SIZE, ttl_seconds: float = PREDICTION_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def key(stage: int, version: str, row: np.ndarray) -> CacheKey:
+        # Hash the float32 bytes: the tree models compare in float32, so rows
+        # that only differ beyond that precision score identically anyway
+        digest = hashlib.blake2b(np.ascontiguousarray(row, dtype=np.float32).tobytes(), digest_size=16)
+        return stage, version, digest.digest()
+
+    def get(self, key: CacheKey) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            CACHE_EVENTS.labels("expiration").inc()
+            CACHE_ENTRIES.set(len(self._entries))
+            return False, None
+
+        self._entries.move_to_end(key)
+        return True, value
+
+    def put(self, key: CacheKey, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+            CACHE_EVENTS.labels("eviction").inc()
+
+        CACHE_ENTRIES.set(len(self._entries))
+
+    async def predict_many(
+        self,
+        stage: int,
+        version: str,
+        X: np.ndarray,
+        compute: Callable[[np.ndarray], Awaitable[Sequence[Any]]],
+    ) -> List[Any]:
+        """
+        Resolve each row from the cache, from an identical in-flight request,
+        or from one compute call over the remaining unique rows
+
+        Args:
+            stage: Model stage the rows are scored with
+            version: Model version the rows are scored with
+            X: Feature matrix
+            compute: Scores a matrix of missed rows, returning one prediction per row
+
+        Returns:
+            One prediction per row of X
+        """
+        if not self.enabled:
+            return np.asarray(await compute(X)).tolist()
+
+        loop = asyncio.get_running_loop()
+        keys = [self.key(stage, version, row) for row in X]
+        results: List[Any] = [None] * len(keys)
+        waiting: List[Tuple[int, asyncio.Future]] = []
+        owned: Dict[CacheKey, asyncio.Future] = {}
+        missed: List[int] = []
+
+        for i, key in enumerate(keys):
+            found, value = self.get(key)
+            if found:
+                self.hits += 1
+                CACHE_EVENTS.labels("hit").inc()
+                results[i] = value
+                continue
+
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                CACHE_EVENTS.labels("coalesced").inc()
+                waiting.append((i, future))
+                continue
+
+            self.misses += 1
+            CACHE_EVENTS.labels("miss").inc()
+            owned[key] = self._inflight[key] = loop.create_future()
+            missed.append(i)
+
+        if missed:
+            task = asyncio.ensure_future(self._compute([keys[i] for i in missed], X[missed], owned, compute))
+            self._tasks.add(task)
+            task.add_done_callback(self._task_done)
+            for i, prediction in zip(missed, await asyncio.shield(task)):
+                results[i] = prediction
+
+        for i, future in waiting:
+            # Shielded too: a cancelled waiter must not cancel the owner's future
+            results[i] = await asyncio.shield(future)
+
+        return results
+
+    async def _compute(
+        self,
+        keys: List[CacheKey],
+        X: np.ndarray,
+        owned: Dict[CacheKey, asyncio.Future],
+        compute: Callable[[np.ndarray], Awaitable[Sequence[Any]]],
+    ) -> List[Any]:
+        """Score the missed rows, then fill the cache and resolve their in-flight futures"""
+        try:
+            predictions = np.asarray(await compute(X)).tolist()
+        except BaseException as e:
+            for key, future in owned.items():
+                self._inflight.pop(key, None)
+                if isinstance(e, asyncio.CancelledError):
+                    future.cancel()  # only on shutdown: the task itself was cancelled
+                else:
+                    future.set_exception(e)
+                    future.exception()  # mark retrieved; the waiters re-raise it
+            raise
+
+        for key, prediction in zip(keys, predictions):
+            self.put(key, prediction)
+            self._inflight.pop(key, None)
+            owned[key].set_result(prediction)
+        return predictions
+
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled():
+            task.exception()  # mark retrieved; the request that started it may be gone
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+    def clear(self):
+        self._entries.clear()
+        CACHE_ENTRIES.set(0)
+
+
+cache = PredictionCache()
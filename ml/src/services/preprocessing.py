@@ -0,0 +1,54 @@
+import os
+import sys
+import joblib  # type: ignore
+import numpy as np
+import pandas as pd
+from src.schemas.prediction import feature_order
+from src.services.metrics import phase_timer
+from src.settings import PREPROCESSOR_DIR
+from src.transformers.custom_transformers import (
+    DelayMinSmoother,
+    FeatureEngineeringTransformer,
+    OrdinalEncoderTransformer,
+)
+
+
+# The pipelines were pickled from the training script, so joblib looks the
+# custom transformers up on __main__. Register them there before loading.
+for _transformer in (DelayMinSmoother, FeatureEngineeringTransformer, OrdinalEncoderTransformer):
+    setattr(sys.modules["__main__"], _transformer.__name__, _transformer)
+
+preprocessor1 = joblib.load(os.path.join(PREPROCESSOR_DIR, "stage1_preprocessor.joblib"))
+preprocessor2 = joblib.load(os.path.join(PREPROCESSOR_DIR, "stage2_preprocessor.joblib"))
+
+
+def to_feature_matrix(transformed_df: pd.DataFrame) -> np.ndarray:
+    """
+    Select the model features from a preprocessed DataFrame
+
+    Mirrors the Flink-side prepare_payload: columns are put in training
+    order, missing columns and NaN/Inf values become 0.0.
+    """
+    missing = [col for col in feature_order if col not in transformed_df.columns]
+    if missing:
+        print(f"[WARNING] Missing columns {missing}, setting to 0.0")
+
+    X = (
+        transformed_df.reindex(columns=feature_order, fill_value=0.0)
+        .apply(pd.to_numeric, errors="coerce")
+        .to_numpy(dtype=float)
+    )
+
+    return np.nan_to_num(X, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def stage1_features(records_df: pd.DataFrame) -> np.ndarray:
+    """Stage 1 feature matrix for a DataFrame of raw merged records"""
+    with phase_timer("preprocessing"):
+        return to_feature_matrix(preprocessor1.transform(records_df))
+
+
+def stage2_features(records_df: pd.DataFrame) -> np.ndarray:
+    """Stage 2 feature matrix for a DataFrame of raw merged records"""
+    with phase_timer("preprocessing"):
+        return to_feature_matrix(preprocessor2.transform(records_df))
@@ -0,0 +1,223 @@
+"""
+Native NumPy inference for the XGBoost stage models.
+
+The boosted trees are compiled into flat node arrays (feature index,
+threshold, children, default direction, leaf value) covering every tree
+in the ensemble. A batch is scored by walking all trees for all rows one
+level at a time with vectorized gathers, so a single row costs a handful
+of small NumPy operations instead of the library's generic predict path.
+"""
+import json
+from typing import Any, Optional
+import numpy as np
+
+
+SUPPORTED_OBJECTIVES = {"binary:logistic", "multi:softprob", "multi:softmax"}
+
+
+class UnsupportedModelError(ValueError):
+    """The model cannot be compiled; callers keep using its own predict"""
+
+
+def parse_base_score(value: str) -> np.ndarray:
+    # Stored as "5E-1" or, in newer releases, as a vector "[5E-1]"
+    return np.array([float(v) for v in value.strip("[]").split(",")], dtype=np.float64)
+
+
+class TreeEnsembleEngine:
+    """Flat-array evaluator for a gbtree classifier, exposing predict()"""
+
+    def __init__(self, feature, threshold, left, right, default_left, value,
+                 roots, tree_class, base_margin, n_classes, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.n_classes = n_classes
+        self.base_margin = base_margin
+        self.max_depth = max_depth
+
+        # (n_trees, n_outputs) one-hot matrix summing leaf values per class
+        n_outputs = 1 if n_classes <= 2 else n_classes
+        self.class_matrix = np.zeros((len(roots), n_outputs), dtype=np.float32)
+        self.class_matrix[np.arange(len(roots)), tree_class] = 1.0
+
+    @classmethod
+    def from_model(cls, model: Any) -> "TreeEnsembleEngine":
+        """
+        Compile a fitted XGBClassifier
+
+        Raises:
+            UnsupportedModelError: For non-tree boosters, categorical splits,
+                vector leaves or objectives other than classification
+        """
+        if not hasattr(model, "get_booster"):
+            raise UnsupportedModelError(f"{type(model).__name__} is not an XGBoost model")
+
+        learner = json.loads(model.get_booster().save_raw("json"))["learner"]
+        booster = learner["gradient_booster"]
+        objective = learner["objective"]["name"]
+
+        if booster["name"] != "gbtree":
+            raise UnsupportedModelError(f"Booster '{booster['name']}' is not supported")
+        if objective not in SUPPORTED_OBJECTIVES:
+            raise UnsupportedModelError(f"Objective '{objective}' is not supported")
+
+        trees = booster["model"]["trees"]
+        tree_info = booster["model"]["tree_info"]
+
+        # Respect early stopping the same way XGBClassifier.predict does
+        best_iteration = model.best_iteration if _has_best_iteration(model) else None
+        if best_iteration is not None:
+            n_trees = booster["model"]["iteration_indptr"][best_iteration + 1]
+            trees, tree_info = trees[:n_trees], tree_info[:n_trees]
+
+        n_classes = max(int(learner["learner_model_param"]["num_class"]), 2)
+        base_score = parse_base_score(learner["learner_model_param"]["base_score"])
+        if objective == "binary:logistic":
+            base_margin = np.log(base_score / (1 - base_score))
+        else:
+            base_margin = base_score
+
+        feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+        offset, max_depth = 0, 0
+        for tree in trees:
+            if any(tree["split_type"]) or int(tree["tree_param"].get("size_leaf_vector", "1")) > 1:
+                raise UnsupportedModelError("Categorical splits and vector leaves are not supported")
+
+            tree_left = np.asarray(tree["left_children"], dtype=np.int32)
+            tree_right = np.asarray(tree["right_children"], dtype=np.int32)
+            is_leaf = tree_left == -1
+            own_index = np.arange(len(tree_left), dtype=np.int32)
+
+            # Leaves point at themselves so every row can take max_depth steps
+            feature.append(np.where(is_leaf, 0, tree["split_indices"]).astype(np.int32))
+            threshold.append(np.asarray(tree["split_conditions"], dtype=np.float32))
+            left.append(np.where(is_leaf, own_index, tree_left) + offset)
+            right.append(np.where(is_leaf, own_index, tree_right) + offset)
+            default_left.append(np.asarray(tree["default_left"], dtype=bool))
+            value.append(np.where(is_leaf, tree["split_conditions"], 0.0).astype(np.float32))
+
+            roots.append(offset)
+            offset += len(tree_left)
+            max_depth = max(max_depth, tree_depth(tree_left, tree_right))
+
+        if not trees:
+            raise UnsupportedModelError("Model has no trees")
+
+        return cls(
+            feature=np.concatenate(feature),
+            threshold=np.concatenate(threshold),
+            left=np.concatenate(left).astype(np.int32),
+            right=np.concatenate(right).astype(np.int32),
+            default_left=np.concatenate(default_left),
+            value=np.concatenate(value),
+            roots=np.asarray(roots, dtype=np.int32),
+            tree_class=np.asarray(tree_info, dtype=np.int32) if n_classes > 2 else np.zeros(len(trees), dtype=np.int32),
+            base_margin=base_margin.astype(np.float32),
+            n_classes=n_classes,
+            max_depth=max_depth,
+        )
+
+    def decision_function(self, X) -> np.ndarray:
+        """Raw margins, shape (n_rows, 1) for binary or (n_rows, n_classes)"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        # Flat offsets: take() on 1D arrays is much cheaper than 2D fancy indexing
+        values = X.ravel()
+        row_offsets = (np.arange(len(X), dtype=np.int64) * X.shape[1])[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+
+        # All rows walk all trees one level per step
+        for _ in range(self.max_depth):
+            x = values.take(row_offsets + self.feature.take(node))
+            go_left = np.where(np.isnan(x), self.default_left.take(node), x < self.threshold.take(node))
+            node = np.where(go_left, self.left.take(node), self.right.take(node))
+
+        return self.value.take(node) @ self.class_matrix + self.base_margin
+
+    def predict(self, X) -> np.ndarray:
+        margins = self.decision_function(X)
+        if margins.shape[1] == 1:
+            return (margins[:, 0] > 0).astype(np.int64)
+        return margins.argmax(axis=1).astype(np.int64)
+
+
+class NativeModel:
+    """
+    Routes small batches to the compiled engine and large ones to the
+    original model, whose native code wins once per-call overhead is amortized
+    """
+
+    def __init__(self, model: Any, engine: TreeEnsembleEngine, max_rows: int):
+        self.model = model
+        self.engine = engine
+        self.max_rows = max_rows
+
+    def predict(self, X) -> np.ndarray:
+        if len(X) <= self.max_rows:
+            return self.engine.predict(X)
+        return self.model.predict(X)
+
+
+def _has_best_iteration(model: Any) -> bool:
+    # XGBoost raises AttributeError when the model was trained without early stopping
+    try:
+        return model.best_iteration is not None
+    except AttributeError:
+        return False
+
+
+def tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+    """Number of splits on the longest root-to-leaf path"""
+    depth = np.zeros(len(left), dtype=np.int32)
+    for node in range(len(left)):
+        if left[node] != -1:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+    return int(depth.max())
+
+
+def threshold_batch(engine: TreeEnsembleEngine, n_features: int, n_rows: int,
+                    nan_rate: float = 0.05, seed: int = 0) -> np.ndarray:
+    """
+    Rows that sit on the model's own split boundaries, for parity checks
+
+    Every value of a column is one of that feature's split thresholds, or
+    the float32 value one ulp below or above it, so each comparison lands on
+    either side of a real split (random data at the wrong scale rarely
+    reaches them). Features no tree splits on are standard normal, and
+    nan_rate of all values are NaN to take the default branches.
+    """
+    rng = np.random.default_rng(seed)
+    is_split = engine.left != np.arange(len(engine.left))
+    split_feature = engine.feature[is_split]
+    split_threshold = engine.threshold[is_split]
+
+    X = rng.normal(size=(n_rows, n_features)).astype(np.float32)
+    for column in np.unique(split_feature):
+        thresholds = np.unique(split_threshold[split_feature == column])
+        candidates = np.concatenate([
+            thresholds,
+            np.nextafter(thresholds, np.float32(-np.inf)),
+            np.nextafter(thresholds, np.float32(np.inf)),
+        ])
+        X[:, column] = rng.choice(candidates, size=n_rows)
+
+    X[rng.random(X.shape) < nan_rate] = np.nan
+    return X
+
+
+def check_parity(model: Any, engine: TreeEnsembleEngine, X: np.ndarray) -> Optional[str]:
+    """Compare engine and model predictions; returns a description of any mismatch"""
+    expected = np.asarray(model.predict(X)).ravel()
+    actual = engine.predict(X)
+
+    mismatches = int((expected != actual).sum())
+    if mismatches:
+        return f"{mismatches}/{len(X)} predictions differ from the original model"
+    return None
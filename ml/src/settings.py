@@ -0,0 +1,49 @@
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+
+# Largest number of feature rows accepted by a single batch request
+MAX_BATCH_SIZE = int(os.getenv("ML_MAX_BATCH_SIZE", 1000))
+
+# Directory holding the fitted stage 1 / stage 2 preprocessing pipelines
+PREPROCESSOR_DIR = os.getenv("ML_PREPROCESSOR_DIR", "src/preprocessors")
+
+# Model versions live in sub-directories of MODEL_DIR (<version>/stage_1.joblib,
+# <version>/stage_2.joblib). Models placed directly in MODEL_DIR are served as
+# the "default" version. MODEL_VERSION pins the version activated at startup;
+# otherwise MODEL_DIR/ACTIVE is read, falling back to the highest version name.
+MODEL_DIR = os.getenv("ML_MODEL_DIR", "src/models")
+MODEL_VERSION = os.getenv("ML_MODEL_VERSION")
+
+# Rows in the synthetic batch scored before a model version takes traffic
+WARMUP_ROWS = int(os.getenv("ML_WARMUP_ROWS", 256))
+
+# Admin endpoints require a matching X-Admin-Token header; unset (default)
+# disables them, every admin request gets 403
+ADMIN_TOKEN = os.getenv("ML_ADMIN_TOKEN")
+
+# Dynamic micro-batching of single-row requests: rows are coalesced for up to
+# MICROBATCH_MAX_WAIT_MS or MICROBATCH_MAX_ROWS, whichever comes first.
+# Setting MICROBATCH_MAX_ROWS to 1 scores every request on its own.
+MICROBATCH_MAX_ROWS = int(os.getenv("ML_MICROBATCH_MAX_ROWS", 64))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("ML_MICROBATCH_MAX_WAIT_MS", 5))
+
+# In-process prediction cache (LRU + TTL). The hourly batch re-reads
+# overlapping Kafka windows, so the TTL should outlive one batch interval.
+# Setting PREDICTION_CACHE_SIZE to 0 disables the cache.
+PREDICTION_CACHE_SIZE = int(os.getenv("ML_PREDICTION_CACHE_SIZE", 100000))
+PREDICTION_CACHE_TTL_SECONDS = float(os.getenv("ML_PREDICTION_CACHE_TTL_SECONDS", 7200))
+
+# "native" compiles the stage tree ensembles into flat NumPy arrays and scores
+# batches of up to NATIVE_ENGINE_MAX_ROWS with them; larger batches and
+# models that cannot be compiled keep using the library's own predict.
+INFERENCE_ENGINE = os.getenv("ML_INFERENCE_ENGINE", "xgboost")
+NATIVE_ENGINE_MAX_ROWS = int(os.getenv("ML_NATIVE_ENGINE_MAX_ROWS", 64))
+
+# Production serving (serve.py): the parent loads the models once and forks
+# WORKERS processes that share them copy-on-write. On shutdown each worker
+# stops accepting and gets GRACEFUL_TIMEOUT_SECONDS to finish in-flight requests.
+WORKERS = int(os.getenv("ML_WORKERS", os.cpu_count() or 1))
+GRACEFUL_TIMEOUT_SECONDS = float(os.getenv("ML_GRACEFUL_TIMEOUT_SECONDS", 30))
@@ -0,0 +1,120 @@
+"""
+Parity of the native tree engine with XGBoost's own predict.
+
+Run from the ml/ directory:
+
+    python -m pytest tests
+"""
+import os
+import joblib  # type: ignore
+import numpy as np
+import pytest
+
+xgboost = pytest.importorskip("xgboost")
+
+from src.schemas.feature_schema import N_FEATURES
+from src.services.model_registry import MODEL_FILES, registry
+from src.services.tree_engine import TreeEnsembleEngine, threshold_batch
+
+
+def real_scale_data(n_rows: int, seed: int = 0):
+    """Features at the scale the stage models see (hours, temperatures, pressure), with gaps"""
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.integers(0, 24, n_rows),            # departure hour
+        rng.normal(28, 6, n_rows),              # temperature, C
+        rng.normal(1010, 8, n_rows),            # pressure, hPa
+        rng.uniform(0, 100, n_rows),            # humidity, %
+        rng.exponential(3, n_rows),             # precipitation, mm
+        rng.integers(0, 360, n_rows),           # wind direction, deg
+    ]).astype(np.float32)
+    score = (X[:, 0] > 17) + (X[:, 2] < 1004) + (X[:, 4] > 5) + rng.normal(0, 0.7, n_rows)
+    X[rng.random(X.shape) < 0.1] = np.nan
+    return X, score
+
+
+def assert_parity(model, X):
+    engine = TreeEnsembleEngine.from_model(model)
+    np.testing.assert_array_equal(engine.predict(X), np.asarray(model.predict(X)).ravel())
+
+
+def boundary_rows(model, n_features: int, n_rows: int = 5000) -> np.ndarray:
+    return threshold_batch(TreeEnsembleEngine.from_model(model), n_features, n_rows)
+
+
+@pytest.fixture(scope="module")
+def binary_model():
+    X, score = real_scale_data(3000)
+    model = xgboost.XGBClassifier(n_estimators=60, max_depth=6, learning_rate=0.3, random_state=0)
+    return model.fit(X, (score > 1.2).astype(int))
+
+
+@pytest.fixture(scope="module")
+def multiclass_model():
+    X, score = real_scale_data(3000, seed=1)
+    model = xgboost.XGBClassifier(n_estimators=40, max_depth=5, random_state=0)
+    return model.fit(X, np.digitize(score, [0.6, 1.4]))
+
+
+def test_threshold_batch_hits_split_boundaries(binary_model):
+    engine = TreeEnsembleEngine.from_model(binary_model)
+    X = threshold_batch(engine, 6, 2000, nan_rate=0.0)
+
+    is_split = engine.left != np.arange(len(engine.left))
+    for column in np.unique(engine.feature[is_split]):
+        thresholds = engine.threshold[is_split & (engine.feature == column)]
+        assert np.isin(thresholds, X[:, column]).any()
+
+
+def test_binary_parity_on_split_boundaries(binary_model):
+    assert_parity(binary_model, boundary_rows(binary_model, 6))
+
+
+def test_binary_parity_on_real_scale_rows(binary_model):
+    X, _ = real_scale_data(5000, seed=2)
+    assert_parity(binary_model, X)
+
+
+def test_multiclass_parity_on_split_boundaries(multiclass_model):
+    assert_parity(multiclass_model, boundary_rows(multiclass_model, 6))
+
+
+def test_float64_input(binary_model):
+    # XGBoost rounds float64 input to float32 before comparing, as the engine does
+    X = boundary_rows(binary_model, 6).astype(np.float64)
+    rng = np.random.default_rng(3)
+    X *= 1 + rng.choice([-1e-9, 0.0, 1e-9], size=X.shape)
+    assert_parity(binary_model, X)
+
+
+def test_single_row(binary_model):
+    for row in boundary_rows(binary_model, 6, n_rows=50):
+        assert_parity(binary_model, row.reshape(1, -1))
+
+
+def test_best_iteration_limits_trees():
+    X, score = real_scale_data(3000, seed=4)
+    y = (score > 1.2).astype(int)
+    model = xgboost.XGBClassifier(
+        n_estimators=300, max_depth=6, learning_rate=0.5, early_stopping_rounds=5, random_state=0,
+    )
+    model.fit(X[:2000], y[:2000], eval_set=[(X[2000:], y[2000:])], verbose=False)
+    assert model.best_iteration + 1 < model.get_booster().num_boosted_rounds()
+
+    engine = TreeEnsembleEngine.from_model(model)
+    assert len(engine.roots) == model.best_iteration + 1
+    assert_parity(model, boundary_rows(model, 6))
+
+
+def stage_model_paths():
+    try:
+        path = registry.version_path(registry.requested_version())
+    except (FileNotFoundError, ValueError):
+        return []
+    return [os.path.join(path, name) for name in MODEL_FILES.values()]
+
+
+@pytest.mark.parametrize("model_path", stage_model_paths())
+def test_stage_model_parity(model_path):
+    model = joblib.load(model_path)
+    assert_parity(model, boundary_rows(model, N_FEATURES, n_rows=20000))